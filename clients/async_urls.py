@@ -0,0 +1,10 @@
+from django.urls import re_path
+
+from .async_views import ClientListView, ClientProfileView, EnrollmentListView
+
+# Same routes and names as the router's, matched first for ASGI requests (health_system.asgi_urls)
+urlpatterns = [
+    re_path(r'^clients/$', ClientListView.as_view(), name='client-list'),
+    re_path(r'^clients/(?P<pk>[^/.]+)/profile/$', ClientProfileView.as_view(), name='client-profile'),
+    re_path(r'^enrollments/$', EnrollmentListView.as_view(), name='enrollment-list'),
+]
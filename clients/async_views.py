@@ -0,0 +1,185 @@
+"""
+Async read paths for the ASGI entry point (``health_system.asgi``).
+
+DRF views are synchronous, so under ASGI a request to one holds a thread
+for as long as its queries take. The hot reads -- the client list and
+search, the client profile and the enrollment list by client or program --
+are served instead by the ``async def`` views below, which read through the
+async ORM. Each borrows its queryset, filter backends, pagination and
+serializers from the viewset it stands in for, authenticates with the same
+``CachedJWTAuthentication`` and goes through the viewset's content
+negotiation, exception handler and response finalization, so the JSON,
+headers (conditional GET validators included) and errors are those of the
+viewset. Writes, format suffixes and anything negotiated to a renderer
+other than JSON (the browsable API) are handed to the viewset itself.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .authentication import CachedJWTAuthentication
+from .conditional import aconditional_response, list_validators
+from .profiles import acache_profile, aget_cached_profile, aprofile_version
+from .serializers import ClientProfileSerializer
+from .versions import astamps
+from .views import ClientViewSet, EnrollmentViewSet
+
+
+class AsyncReadView(View):
+    """
+    Async ``GET`` for one action of ``viewset``; ``actions`` is the router's
+    method mapping for the same URL, used for every other request.
+    """
+    viewset = None
+    action = None
+    actions = None
+    detail = False
+
+    viewset_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        initkwargs.setdefault('viewset_view', cls.viewset.as_view(
+            cls.actions, basename=cls.basename(), detail=cls.detail
+        ))
+        # Like the viewsets, authenticated by token rather than session
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    @classmethod
+    def basename(cls):
+        # As the router derives it
+        return cls.viewset.queryset.model._meta.object_name.lower()
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.viewset_instance = viewset = self.get_viewset(request, args, kwargs)
+        if request.method not in ('GET', 'HEAD') or not self.negotiate(viewset):
+            return await sync_to_async(self.viewset_view)(request, *args, **kwargs)
+        try:
+            await self.authenticate(viewset)
+            self.check_permissions(viewset)
+            response = await self.get(viewset.request, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        return self.finalize(viewset, response)
+
+    def get_viewset(self, request, args, kwargs):
+        """A viewset instance set up as its ``as_view()`` would for this request."""
+        viewset = self.viewset(
+            request=Request(request, authenticators=[CachedJWTAuthentication()]),
+            args=args, kwargs=kwargs, format_kwarg=None,
+            action=self.action, action_map=self.actions, basename=self.basename(), detail=self.detail,
+        )
+        for method, action in self.actions.items():
+            setattr(viewset, method, getattr(viewset, action))
+        if hasattr(viewset, 'get') and not hasattr(viewset, 'head'):
+            viewset.head = viewset.get
+        viewset.headers = viewset.default_response_headers
+        return viewset
+
+    def negotiate(self, viewset):
+        """Select the viewset's renderer; ``False`` unless it is plain JSON."""
+        try:
+            renderer, media_type = viewset.perform_content_negotiation(viewset.request)
+        except exceptions.NotAcceptable:
+            return False
+        viewset.request.accepted_renderer = renderer
+        viewset.request.accepted_media_type = media_type
+        return type(renderer) is JSONRenderer
+
+    async def authenticate(self, viewset):
+        request = viewset.request
+        backend = request.authenticators[0]
+        result = await backend.aauthenticate(request._request, view=viewset)
+        request.user, request.auth = result if result is not None else (AnonymousUser(), None)
+
+    def check_permissions(self, viewset):
+        # viewset.check_permissions() would re-authenticate synchronously on denial
+        request = viewset.request
+        for permission in viewset.get_permissions():
+            if not permission.has_permission(request, viewset):
+                if request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, 'message', None), getattr(permission, 'code', None)
+                )
+
+    def finalize(self, viewset, response):
+        response = viewset.finalize_response(viewset.request, response)
+        if not isinstance(response, Response):
+            return response
+        # Rendered here, so the handler has no deferred render() to run in a thread
+        content = response.rendered_content
+        rendered = HttpResponse(content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    async def get_object(self, viewset):
+        """``get_object()`` with the row read by the async ORM."""
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        lookup = viewset.kwargs[viewset.lookup_url_kwarg or viewset.lookup_field]
+        try:
+            instance = await queryset.aget(**{viewset.lookup_field: lookup})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        viewset.check_object_permissions(viewset.request, instance)
+        return instance
+
+
+class AsyncListView(AsyncReadView):
+    """The conditional, paginated ``list`` of a ``ConditionalGetMixin`` viewset."""
+    action = 'list'
+    actions = {'get': 'list', 'post': 'create'}
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset_instance
+        values, last_modified = list_validators(
+            await astamps(*viewset.get_conditional_models()), viewset.get_conditional_date()
+        )
+        return await aconditional_response(request, values, last_modified, lambda: self.list(viewset))
+
+    async def list(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+        if page is None:
+            return Response(viewset.get_serializer([row async for row in queryset], many=True).data)
+        return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data)
+
+
+class ClientListView(AsyncListView):
+    viewset = ClientViewSet
+
+
+class EnrollmentListView(AsyncListView):
+    viewset = EnrollmentViewSet
+
+
+class ClientProfileView(AsyncReadView):
+    viewset = ClientViewSet
+    action = 'profile'
+    actions = {'get': 'profile'}
+    detail = True
+
+    async def get(self, request, pk=None):
+        viewset = self.viewset_instance
+
+        async def render():
+            data = await aget_cached_profile(pk)
+            if data is None:
+                client = await self.get_object(viewset)
+                data = ClientProfileSerializer(client).data
+                await acache_profile(client.pk, data)
+            return Response(data)
+
+        version = await aprofile_version(pk)
+        if version is None:
+            return await render()
+        return await aconditional_response(request, *version, render)
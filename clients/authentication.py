@@ -0,0 +1,136 @@
+"""
+JWT authentication without a user query on every request.
+
+``CachedJWTAuthentication`` keeps the users it loads in a small per-process
+LRU for ``AUTH_USER_CACHE_TIMEOUT`` seconds. Saving or deleting a user drops
+its entry in the process that made the change; other worker processes pick
+the change up when their entry expires, so keep the timeout short.
+
+With ``AUTH_STATELESS_READS = True``, safe requests to views that set
+``stateless_user = True`` skip the lookup entirely and get a ``TokenUser``
+built from the token claims. Such a user carries only the id from the
+token, and a deactivated user keeps read access until the token expires.
+
+The async read views (``clients.async_views``) go through ``aauthenticate``,
+which applies the same checks and loads cache misses with the async ORM.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+        # Each request gets its own copy to mutate
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+        if not timeout:
+            return
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + timeout, copy.copy(user))
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > getattr(settings, 'AUTH_USER_CACHE_MAX_ENTRIES', 10000):
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    async def aauthenticate(self, request, view=None):
+        """
+        ``authenticate`` for async views, given the Django request. Only a
+        user cache miss reaches the database, through the async ORM.
+        """
+        self.request = request
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if self.is_stateless(view):
+            return api_settings.TOKEN_USER_CLASS(validated_token), validated_token
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            self.check_user(user, validated_token)
+            user_cache.set(user_id, user)
+            return user, validated_token
+        return self.check_user(user, validated_token), validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if self.is_stateless():
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+        return self.check_user(user, validated_token)
+
+    def check_user(self, user, validated_token):
+        # The same checks super() applies to a freshly loaded user
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+    def is_stateless(self, view=None):
+        request = getattr(self, 'request', None)
+        if request is None or not getattr(settings, 'AUTH_STATELESS_READS', False):
+            return False
+        if view is None:
+            view = getattr(request, 'parser_context', {}).get('view')
+        return request.method in SAFE_METHODS and getattr(view, 'stateless_user', False)
@@ -0,0 +1,66 @@
+"""
+Name index behind ``/api/clients/autocomplete/``.
+
+Each client has two ``ClientNameKey`` rows, its normalized name in both
+orders with the spaces removed (``"johndoe"`` and ``"doejohn"``), each
+carrying the display name.
+The ``(key, client, display)`` index is sorted by key, so a query is a
+single range scan from the typed prefix that stops after ``limit`` rows and
+never touches the client table: typing either name, or both in either
+order, narrows the same scan.
+"""
+from .indexing import ClientIndex
+from .search import tokenize
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 20
+MAX_KEY_LENGTH = 100
+MAX_DISPLAY_LENGTH = 201
+NAME_FIELDS = ('first_name', 'last_name')
+
+
+def normalize_name(value):
+    # No separators: locale collations skip spaces when comparing, which
+    # would break the range scan below outside byte-order ("C") collation
+    return ''.join(tokenize(value))
+
+
+def name_keys(first_name, last_name):
+    first, last = normalize_name(first_name), normalize_name(last_name)
+    keys = {first + last, last + first}
+    return {key[:MAX_KEY_LENGTH] for key in keys if key}
+
+
+def name_rows(client):
+    display = f'{client.first_name} {client.last_name}'[:MAX_DISPLAY_LENGTH]
+    return [(key, display) for key in name_keys(client.first_name, client.last_name)]
+
+
+NAME_KEY_INDEX = ClientIndex('ClientNameKey', ('key', 'display'), name_rows, NAME_FIELDS)
+
+
+def index_client_names(clients, replace=True):
+    """(Re)build the name keys of ``clients`` (see ``bulk`` for bulk inserts)."""
+    NAME_KEY_INDEX.update(clients, replace)
+
+
+def autocomplete_clients(query, limit=DEFAULT_SUGGESTIONS):
+    """Up to ``limit`` ``{'id', 'name'}`` of clients whose name starts with ``query``."""
+    from .models import ClientNameKey
+
+    prefix = normalize_name(query)[:MAX_KEY_LENGTH]
+    if not prefix:
+        return []
+    # Keys only contain [a-z0-9], so padding with 'z' bounds every key
+    # starting with ``prefix`` under any collation, as in search._word_match
+    upper = prefix + 'z' * (MAX_KEY_LENGTH - len(prefix))
+    rows = (
+        ClientNameKey.objects.filter(key__range=(prefix, upper))
+        .order_by('key', 'client_id')
+        .values_list('client_id', 'display')[:limit * 2]
+    )
+    # A client matching in both name orders comes back twice
+    results = {}
+    for client_id, display in rows:
+        results.setdefault(client_id, display)
+    return [{'id': client_id, 'name': display} for client_id, display in list(results.items())[:limit]]
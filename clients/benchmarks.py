@@ -0,0 +1,503 @@
+"""
+In-process API benchmarks with query-count and latency budgets.
+
+Run separately from the functional tests:
+
+    python manage.py test clients.benchmarks
+
+A synthetic dataset is generated first (``BENCHMARK_CLIENTS`` clients,
+default 20000). Every endpoint is called once with SQL instrumentation to
+count queries and rows fetched, then ``BENCHMARK_ITERATIONS`` times (default
+50) for p50/p95/p99 latency. Results are written to ``BENCHMARK_OUTPUT``
+(default ``bench_output.json``). An endpoint fails when it exceeds its
+budget below, or when it is worse than the stored baseline
+(``BENCHMARK_BASELINE``, default ``benchmark_baseline.json``): more queries,
+or a p95 above ``baseline * (1 + BENCHMARK_TOLERANCE) + 1ms``. Set
+``BENCHMARK_UPDATE_BASELINE=1`` to record the current results as the new
+baseline; a missing baseline is recorded automatically. The ``async-*``
+entries measure the async views of the ASGI entry point the same way.
+
+``ConcurrencyBenchmark`` compares the two entry points under load instead:
+the hot read endpoints are requested ``BENCHMARK_CONCURRENCY`` at a time
+(default 64) through the WSGI application and through the ASGI application
+on one event loop. Both get the same budget of ``BENCHMARK_THREADS``
+threads (default 4): the WSGI side runs that many workers, standing in for
+sync gunicorn workers, and the ASGI side serves that many requests at once,
+since each request waits on the database in a ``sync_to_async`` thread of
+its own. Every query is delayed by ``BENCHMARK_DB_LATENCY_MS`` (default 20)
+to model a slow database. Throughput and latency percentiles of both are
+recorded in ``BENCHMARK_CONCURRENCY_OUTPUT`` (default
+``bench_concurrency.json``) for comparison; no winner is asserted.
+
+``BulkInsertBenchmark`` measures ``POST /api/clients/bulk/`` with
+``BENCHMARK_BULK_ROWS`` new clients (default 10000), end to end and for
+the insert alone (``bulk_create_clients`` on validated rows, derived tables
+included). Rows per second of both go to ``BENCHMARK_BULK_OUTPUT`` (default
+``bench_bulk.json``); the request fails below ``BENCHMARK_BULK_MIN_RATE``
+rows/s (default 2500), a regression floor rather than a target.
+"""
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .bulk import bulk_create_clients, validate_rows
+from .datagen import FIRST_NAMES, LAST_NAMES, generate
+from .models import Change, Client, Program
+from .serializers import ClientSerializer
+
+DATASET_CLIENTS = int(os.environ.get('BENCHMARK_CLIENTS', 20000))
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', 50))
+OUTPUT = os.environ.get('BENCHMARK_OUTPUT', 'bench_output.json')
+BASELINE = os.environ.get('BENCHMARK_BASELINE', 'benchmark_baseline.json')
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', 0.5))
+UPDATE_BASELINE = os.environ.get('BENCHMARK_UPDATE_BASELINE') == '1'
+CONCURRENCY = int(os.environ.get('BENCHMARK_CONCURRENCY', 64))
+THREADS = int(os.environ.get('BENCHMARK_THREADS', 4))
+DB_LATENCY_MS = float(os.environ.get('BENCHMARK_DB_LATENCY_MS', 20))
+CONCURRENCY_CLIENTS = int(os.environ.get('BENCHMARK_CONCURRENCY_CLIENTS', 2000))
+CONCURRENCY_OUTPUT = os.environ.get('BENCHMARK_CONCURRENCY_OUTPUT', 'bench_concurrency.json')
+BULK_ROWS = int(os.environ.get('BENCHMARK_BULK_ROWS', 10000))
+BULK_MIN_RATE = float(os.environ.get('BENCHMARK_BULK_MIN_RATE', 2500))
+BULK_OUTPUT = os.environ.get('BENCHMARK_BULK_OUTPUT', 'bench_bulk.json')
+
+# Queries include the conditional GET validators (the authenticated user is
+# cached after the warm-up requests); creates also maintain the derived tables
+BUDGETS = {
+    'client-list': {'queries': 2, 'p95_ms': 50},
+    'client-list-deep': {'queries': 2, 'p95_ms': 50},
+    'client-search': {'queries': 2, 'p95_ms': 100},
+    'client-profile': {'queries': 3, 'p95_ms': 50},
+    'enrollments-by-client': {'queries': 2, 'p95_ms': 50},
+    'enrollments-by-program': {'queries': 2, 'p95_ms': 50},
+    'enrollments-expanded': {'queries': 2, 'p95_ms': 50},
+    'program-roster': {'queries': 2, 'p95_ms': 50},
+    'client-create': {'queries': 12, 'p95_ms': 50},
+    'dashboard-summary': {'queries': 3, 'p95_ms': 50},
+    'program-stats': {'queries': 2, 'p95_ms': 50},
+    'program-list': {'queries': 1, 'p95_ms': 20},
+    'change-feed': {'queries': 5, 'p95_ms': 100},
+    'client-lookup': {'queries': 1, 'p95_ms': 20},
+    'client-autocomplete': {'queries': 1, 'p95_ms': 10},
+    'client-cohort': {'queries': 2, 'p95_ms': 50},
+    'async-client-list': {'queries': 2, 'p95_ms': 50},
+    'async-client-search': {'queries': 2, 'p95_ms': 100},
+    'async-client-profile': {'queries': 3, 'p95_ms': 50},
+    'async-enrollments-by-client': {'queries': 2, 'p95_ms': 50},
+    'async-enrollments-by-program': {'queries': 2, 'p95_ms': 50},
+}
+
+
+def client_row(n):
+    """Client ``n`` of a sequence of distinct people, so duplicate checks let each one through."""
+    return {
+        'first_name': FIRST_NAMES[n % len(FIRST_NAMES)],
+        'last_name': LAST_NAMES[n // len(FIRST_NAMES) % len(LAST_NAMES)],
+        'date_of_birth': datetime.date(1950, 1, 1) + datetime.timedelta(days=n * 37 % 20000),
+        'gender': 'F',
+        'contact_number': f'07{n:08d}',
+        'email': f'bench{n}@example.com',
+        'address': 'Nairobi',
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class _CountingCursor:
+    """Proxy around a DB-API cursor that counts the rows fetched through it."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._stats['rows'] += row is not None
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats['rows'] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats['rows'] += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._stats['rows'] += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SQLRecorder:
+    """Counts queries and fetched rows through ``connection.execute_wrapper``."""
+
+    def __init__(self):
+        self.stats = {'queries': 0, 'rows': 0}
+
+    def __call__(self, execute, sql, params, many, context):
+        wrapper = context['cursor']
+        if not isinstance(wrapper.cursor, _CountingCursor):
+            wrapper.cursor = _CountingCursor(wrapper.cursor, self.stats)
+        self.stats['queries'] += 1
+        return execute(sql, params, many, context)
+
+
+class APIBenchmark(TestCase):
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        generate(DATASET_CLIENTS, 10, seed=1)
+        cls.user = User.objects.create_user(username='benchmark', password='benchmark')
+        cls.busy_client = (
+            Client.objects.filter(enrollments__isnull=False).order_by('-created_at').first()
+        )
+        cls.popular_program = Program.objects.order_by('pk').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if not cls.results:
+            return
+        report = {
+            'dataset': {
+                'clients': DATASET_CLIENTS,
+                'database': connection.vendor,
+            },
+            'endpoints': cls.results,
+        }
+        with open(OUTPUT, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        if UPDATE_BASELINE or not os.path.exists(BASELINE):
+            with open(BASELINE, 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.async_api = AsyncClient()
+        self.async_headers = {'Authorization': f'Bearer {token}'}
+
+    def async_get(self, url, params=None):
+        return async_to_sync(self.async_api.get)(url, params, headers=self.async_headers)
+
+    def measure(self, name, request):
+        for _ in range(3):
+            request()
+
+        recorder = SQLRecorder()
+        with connection.execute_wrapper(recorder):
+            response = request()
+        self.assertLess(response.status_code, 400, response.content[:500])
+
+        samples = []
+        for _ in range(ITERATIONS):
+            started = time.perf_counter()
+            request()
+            samples.append((time.perf_counter() - started) * 1000)
+
+        result = {
+            'queries': recorder.stats['queries'],
+            'rows': recorder.stats['rows'],
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'p99_ms': round(percentile(samples, 0.99), 3),
+        }
+        type(self).results[name] = result
+        self.check_budget(name, result)
+        self.check_baseline(name, result)
+        return result
+
+    def check_budget(self, name, result):
+        budget = BUDGETS[name]
+        self.assertLessEqual(result['queries'], budget['queries'], f'{name}: query budget exceeded')
+        self.assertLessEqual(result['p95_ms'], budget['p95_ms'], f'{name}: p95 latency budget exceeded')
+
+    def check_baseline(self, name, result):
+        if UPDATE_BASELINE or not os.path.exists(BASELINE):
+            return
+        with open(BASELINE) as handle:
+            baseline = json.load(handle)['endpoints'].get(name)
+        if baseline is None:
+            return
+        self.assertLessEqual(result['queries'], baseline['queries'], f'{name}: more queries than baseline')
+        limit = baseline['p95_ms'] * (1 + TOLERANCE) + 1
+        self.assertLessEqual(result['p95_ms'], limit, f'{name}: p95 regressed against baseline')
+
+    def test_client_list(self):
+        self.measure('client-list', lambda: self.api.get(reverse('client-list')))
+
+    def test_client_list_deep(self):
+        url = reverse('client-list')
+        for _ in range(50):
+            url = self.api.get(url).data['next']
+        self.measure('client-list-deep', lambda: self.api.get(url))
+
+    def test_client_search(self):
+        self.measure('client-search', lambda: self.api.get(reverse('client-list'), {'search': 'mwangi'}))
+
+    def test_client_profile(self):
+        url = reverse('client-profile', args=[self.busy_client.pk])
+        self.measure('client-profile', lambda: self.api.get(url))
+
+    def test_enrollments_by_client(self):
+        self.measure('enrollments-by-client', lambda: self.api.get(
+            reverse('enrollment-list'), {'client': self.busy_client.pk}
+        ))
+
+    def test_enrollments_by_program(self):
+        self.measure('enrollments-by-program', lambda: self.api.get(
+            reverse('enrollment-list'), {'program': self.popular_program.pk}
+        ))
+
+    def test_enrollments_expanded(self):
+        self.measure('enrollments-expanded', lambda: self.api.get(
+            reverse('enrollment-list'), {'program': self.popular_program.pk, 'expand': 'client,program'}
+        ))
+
+    def test_program_roster(self):
+        url = reverse('program-clients', args=[self.popular_program.pk])
+        self.measure('program-roster', lambda: self.api.get(url, {'status': 'active'}))
+
+    def test_client_create(self):
+        counter = iter(range(10 ** 6))
+        self.measure('client-create', lambda: self.api.post(
+            reverse('client-list'), client_row(next(counter)), format='json'
+        ))
+
+    def test_dashboard_summary(self):
+        self.measure('dashboard-summary', lambda: self.api.get(reverse('dashboard-summary')))
+
+    def test_program_stats(self):
+        url = reverse('program-stats', args=[self.popular_program.pk])
+        self.measure('program-stats', lambda: self.api.get(url, {'interval': 'month'}))
+
+    def test_program_list(self):
+        self.measure('program-list', lambda: self.api.get(reverse('program-list')))
+
+    def test_client_lookup(self):
+        phone = self.busy_client.contact_number
+        self.measure('client-lookup', lambda: self.api.get(reverse('client-lookup'), {'phone': phone}))
+
+    def test_client_autocomplete(self):
+        self.measure('client-autocomplete', lambda: self.api.get(reverse('client-autocomplete'), {'q': 'mw'}))
+
+    def test_client_cohort(self):
+        self.measure('client-cohort', lambda: self.api.get(reverse('client-list'), {
+            'gender': 'F', 'min_age': 15, 'max_age': 49,
+            'program': self.popular_program.pk, 'enrollment_status': 'active',
+        }))
+
+    def test_change_feed(self):
+        since = Change.objects.order_by('seq').values_list('seq', flat=True)[Change.objects.count() // 2]
+        self.measure('change-feed', lambda: self.api.get(reverse('change-feed'), {'since': since}))
+
+    def test_async_client_list(self):
+        self.measure('async-client-list', lambda: self.async_get(reverse('client-list')))
+
+    def test_async_client_search(self):
+        self.measure('async-client-search', lambda: self.async_get(reverse('client-list'), {'search': 'mwangi'}))
+
+    def test_async_client_profile(self):
+        url = reverse('client-profile', args=[self.busy_client.pk])
+        self.measure('async-client-profile', lambda: self.async_get(url))
+
+    def test_async_enrollments_by_client(self):
+        self.measure('async-enrollments-by-client', lambda: self.async_get(
+            reverse('enrollment-list'), {'client': self.busy_client.pk}
+        ))
+
+    def test_async_enrollments_by_program(self):
+        self.measure('async-enrollments-by-program', lambda: self.async_get(
+            reverse('enrollment-list'), {'program': self.popular_program.pk}
+        ))
+
+
+class BulkInsertBenchmark(TestCase):
+    """Rows per second of bulk client registration."""
+
+    def test_client_bulk(self):
+        api = APIClient()
+        user = User.objects.create_user(username='benchmark', password='benchmark')
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        rows = [client_row(n) for n in range(BULK_ROWS)]
+        started = time.perf_counter()
+        response = api.post(reverse('client-bulk'), rows, format='json')
+        request_seconds = time.perf_counter() - started
+        self.assertEqual(response.data['created'], BULK_ROWS, response.data['errors'][:5])
+
+        valid, errors = validate_rows([client_row(n) for n in range(BULK_ROWS, 2 * BULK_ROWS)], ClientSerializer)
+        self.assertEqual(errors, [])
+        started = time.perf_counter()
+        bulk_create_clients([data for _, data in valid])
+        insert_seconds = time.perf_counter() - started
+
+        report = {
+            'dataset': {'rows': BULK_ROWS, 'database': connection.vendor},
+            'request_rows_per_second': round(BULK_ROWS / request_seconds, 1),
+            'insert_rows_per_second': round(BULK_ROWS / insert_seconds, 1),
+        }
+        with open(BULK_OUTPUT, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        self.assertGreaterEqual(report['request_rows_per_second'], BULK_MIN_RATE, 'bulk insert rate below floor')
+
+
+def slow_query(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY_MS / 1000)
+    return execute(sql, params, many, context)
+
+
+def add_latency(sender, connection, **kwargs):
+    if slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query)
+
+
+class ConcurrencyBenchmark(TransactionTestCase):
+    """WSGI worker threads against the ASGI event loop, on a slow database."""
+
+    def setUp(self):
+        generate(CONCURRENCY_CLIENTS, 10, seed=1)
+        user = User.objects.create_user(username='benchmark', password='benchmark')
+        self.authorization = f'Bearer {RefreshToken.for_user(user).access_token}'
+        client = Client.objects.filter(enrollments__isnull=False).order_by('-created_at').first()
+        program = Program.objects.order_by('pk').first()
+        self.requests = [
+            ('/api/clients/', ''),
+            ('/api/clients/', 'search=mwangi'),
+            (f'/api/clients/{client.pk}/profile/', ''),
+            ('/api/enrollments/', f'client={client.pk}'),
+            ('/api/enrollments/', f'program={program.pk}'),
+        ] * CONCURRENCY
+        # Every connection opened from here on (one per worker thread) is slow
+        connection_created.connect(add_latency)
+        self.addCleanup(connection_created.disconnect, add_latency)
+
+    def test_concurrent_reads(self):
+        wsgi = self.run_wsgi()
+        asgi = async_to_sync(self.run_asgi)()
+        report = {
+            'dataset': {'clients': CONCURRENCY_CLIENTS, 'database': connection.vendor},
+            'settings': {
+                'concurrency': CONCURRENCY,
+                'threads': THREADS,
+                'db_latency_ms': DB_LATENCY_MS,
+                'requests': len(self.requests),
+            },
+            'wsgi': wsgi,
+            'asgi': asgi,
+        }
+        with open(CONCURRENCY_OUTPUT, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+    def summarize(self, samples, elapsed):
+        return {
+            'requests_per_second': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(samples, 0.50), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'p99_ms': round(percentile(samples, 0.99), 3),
+        }
+
+    def run_wsgi(self):
+        """``CONCURRENCY`` clients, each waiting for one of ``THREADS`` workers."""
+        application = get_wsgi_application()
+        factory = RequestFactory()
+        workers = threading.BoundedSemaphore(THREADS)
+
+        def call(path, query):
+            environ = factory._base_environ(
+                PATH_INFO=path, QUERY_STRING=query, HTTP_AUTHORIZATION=self.authorization
+            )
+            statuses = []
+            with workers:
+                response = application(environ, lambda status, headers: statuses.append(status))
+                b''.join(response)
+                response.close()
+            self.assertTrue(statuses[0].startswith('200'), statuses[0])
+
+        def client(requests):
+            samples = []
+            for path, query in requests:
+                started = time.perf_counter()
+                call(path, query)
+                samples.append((time.perf_counter() - started) * 1000)
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(CONCURRENCY) as pool:
+            shares = pool.map(client, [self.requests[index::CONCURRENCY] for index in range(CONCURRENCY)])
+            samples = [sample for share in shares for sample in share]
+        return self.summarize(samples, time.perf_counter() - started)
+
+    async def run_asgi(self):
+        """``CONCURRENCY`` clients on one event loop, ``THREADS`` requests served at a time."""
+        application = get_asgi_application()
+        workers = asyncio.Semaphore(THREADS)
+
+        async def call(path, query):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', b'testserver'), (b'authorization', self.authorization.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+            received = asyncio.Event()
+            finished = asyncio.Event()
+            messages = []
+
+            async def receive():
+                if not received.is_set():
+                    received.set()
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The handler listens for a disconnect until the response is sent
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+
+            async with workers:
+                await application(scope, receive, send)
+            finished.set()
+            self.assertEqual(messages[0]['status'], 200, messages[-1].get('body', b'')[:200])
+
+        async def client(requests):
+            samples = []
+            for path, query in requests:
+                started = time.perf_counter()
+                await call(path, query)
+                samples.append((time.perf_counter() - started) * 1000)
+            return samples
+
+        started = time.perf_counter()
+        shares = await asyncio.gather(*(
+            client(self.requests[index::CONCURRENCY]) for index in range(CONCURRENCY)
+        ))
+        samples = [sample for share in shares for sample in share]
+        return self.summarize(samples, time.perf_counter() - started)
@@ -0,0 +1,196 @@
+"""
+Bulk write paths that bypass per-row ``save()``.
+
+Signal handlers keep the derived data of single-row writes in step. The
+rows written here send no signals, so every helper that inserts rows must
+also, chunk by chunk and in the chunk's transaction:
+
+- write the index rows (``index_clients``, ``index_client_names``,
+  ``index_match_keys``, with ``replace=False`` for new rows);
+- adjust the summary counters and enrollment rollups;
+- ``touch`` the change stamps of the written models and ``log_changes``;
+- drop cached profiles (``invalidate_client_profiles``).
+
+Rows are written with raw SQL where that is cheaper than building a model
+instance per row.
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .autocomplete import index_client_names
+from .changes import log_changes
+from .duplicates import index_match_keys
+from .models import Client, Enrollment
+from .profiles import invalidate_client_profiles
+from .rollups import adjust_rollups, rollup_deltas
+from .search import index_clients
+from .summary import CLIENTS, adjust_counter, adjust_program_counts, count_enrollments
+from .versions import touch
+
+BATCH_SIZE = 1000
+
+
+def validate_rows(rows, serializer_class):
+    """
+    Validate ``rows`` with ``serializer_class`` semantics.
+
+    Returns ``(valid, errors)`` where ``valid`` is a list of
+    ``(index, validated_data)`` pairs and ``errors`` a list of
+    ``{'index': ..., 'errors': ...}`` dicts. A single serializer instance is
+    reused for every row so field construction is paid once.
+    """
+    serializer = serializer_class()
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object.']}})
+            continue
+        try:
+            valid.append((index, serializer.run_validation(row)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return valid, errors
+
+
+def insert_clients(clients):
+    """Insert a chunk of ``Client`` instances, index and count them."""
+    now = timezone.now()
+    for client in clients:
+        client.normalize_contacts()
+        client.created_at = client.updated_at = now
+    using = router.db_for_write(Client)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        insert_returning_pks(clients, using)
+    else:
+        Client.objects.bulk_create(clients)
+    index_clients(clients, replace=False)
+    index_client_names(clients, replace=False)
+    index_match_keys(clients, replace=False)
+    adjust_counter(CLIENTS, len(clients))
+    touch(Client)
+    log_changes(Client, [client.pk for client in clients], 'create')
+    return clients
+
+
+def insert_returning_pks(objs, using):
+    """
+    ``bulk_create`` for new instances of a model with only plain column fields.
+
+    Rows go out as multi-row ``INSERT ... RETURNING`` statements built from
+    the instance attributes: text columns as they are, other values prepared
+    once per distinct value (a chunk shares its timestamps). This skips the
+    per-field, per-row ``pre_save`` and preparation of ``bulk_create``.
+    """
+    model = type(objs[0])
+    connection = connections[using]
+    ops = connection.ops
+    pk = model._meta.pk
+    fields = [field for field in model._meta.concrete_fields if field is not pk]
+    columns = []
+    for field in fields:
+        values = [getattr(obj, field.attname) for obj in objs]
+        if field.get_internal_type() not in ('CharField', 'TextField'):
+            prepared = {value: field.get_db_prep_save(value, connection) for value in set(values)}
+            values = [prepared[value] for value in values]
+        columns.append(values)
+    rows = list(zip(*columns))
+
+    sql = 'INSERT INTO {} ({}) VALUES '.format(
+        ops.quote_name(model._meta.db_table), ', '.join(ops.quote_name(field.column) for field in fields)
+    )
+    placeholder = '({})'.format(', '.join(['%s'] * len(fields)))
+    batch_size = ops.bulk_batch_size(fields, objs)
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                sql + ', '.join([placeholder] * len(batch)) + ' RETURNING ' + ops.quote_name(pk.column),
+                [value for row in batch for value in row],
+            )
+            for obj, (value,) in zip(objs[start:start + batch_size], cursor.fetchall()):
+                obj.pk = value
+                obj._state.adding = False
+                obj._state.db = using
+
+
+def bulk_create_clients(rows, batch_size=BATCH_SIZE):
+    """Insert validated client dicts in chunks; one transaction per chunk."""
+    created = []
+    for start in range(0, len(rows), batch_size):
+        chunk = [Client(**data) for data in rows[start:start + batch_size]]
+        with transaction.atomic():
+            insert_clients(chunk)
+        created.extend(chunk)
+    return created
+
+
+def insert_enrollments(enrollments):
+    """
+    ``bulk_create`` a chunk of enrollments, skipping existing client/program pairs.
+
+    Pairs already in the database (or repeated within the chunk) are dropped
+    before inserting so the summary counts only what was created; the insert
+    still uses ``ignore_conflicts`` in case a concurrent write races it.
+    Returns the enrollments that were inserted.
+    """
+    existing = set()
+    if enrollments:
+        existing = set(
+            Enrollment.objects.filter(
+                client_id__in={enrollment.client_id for enrollment in enrollments},
+                program_id__in={enrollment.program_id for enrollment in enrollments},
+            ).values_list('client_id', 'program_id')
+        )
+    new = []
+    for enrollment in enrollments:
+        pair = (enrollment.client_id, enrollment.program_id)
+        if pair not in existing:
+            existing.add(pair)
+            new.append(enrollment)
+    Enrollment.objects.bulk_create(new, ignore_conflicts=True)
+    adjust_program_counts(count_enrollments(new))
+    adjust_rollups(rollup_deltas(new))
+    if new:
+        touch(Enrollment)
+        log_changes(Enrollment, inserted_ids(new), 'create')
+    invalidate_client_profiles({enrollment.client_id for enrollment in new})
+    return new
+
+
+def inserted_ids(enrollments):
+    # ignore_conflicts leaves the primary keys unset; read them back
+    pairs = {(enrollment.client_id, enrollment.program_id) for enrollment in enrollments}
+    rows = Enrollment.objects.filter(
+        client_id__in={client_id for client_id, _ in pairs},
+        program_id__in={program_id for _, program_id in pairs},
+    ).order_by('pk').values_list('pk', 'client_id', 'program_id')
+    return [pk for pk, client_id, program_id in rows if (client_id, program_id) in pairs]
+
+
+def bulk_enroll(program, client_ids, enrollment_date, status='active', notes='', batch_size=BATCH_SIZE):
+    """
+    Enroll ``client_ids`` into ``program``, skipping clients already enrolled.
+
+    Each chunk looks up unknown clients with one indexed query, then hands
+    the rest to ``insert_enrollments``, which skips existing pairs. Returns
+    ``(created, skipped, not_found)`` where ``not_found`` lists the ids that
+    match no client.
+    """
+    client_ids = list(dict.fromkeys(client_ids))
+    created, skipped, not_found = 0, 0, []
+    for start in range(0, len(client_ids), batch_size):
+        chunk = client_ids[start:start + batch_size]
+        with transaction.atomic():
+            known = set(Client.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+            inserted = insert_enrollments([
+                Enrollment(
+                    client_id=pk, program=program, enrollment_date=enrollment_date,
+                    status=status, notes=notes
+                )
+                for pk in chunk if pk in known
+            ])
+        created += len(inserted)
+        skipped += len(known) - len(inserted)
+        not_found.extend(pk for pk in chunk if pk not in known)
+    return created, skipped, not_found
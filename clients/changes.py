@@ -0,0 +1,146 @@
+"""
+Change feed for incremental sync (``/api/changes/``): one ``Change`` per
+write, ordered by ``seq`` and pruned by ``manage.py compact_changes``.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, F, Max, Min, OuterRef
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .indexing import insert_rows
+from .models import Change, Client, Enrollment, Program, SummaryCounter
+from .summary import upsert
+
+HORIZON = 'changes:horizon'
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 5000
+COMPACT_BATCH_SIZE = 10000
+
+
+def log_changes(model, ids, action):
+    """Append one ``action`` entry per id, all stamped with the same ``created_at``."""
+    name = model._meta.model_name
+    using = router.db_for_write(Change)
+    created_at = Change._meta.get_field('created_at').get_db_prep_save(timezone.now(), connections[using])
+    rows = [(name, pk, action, created_at) for pk in ids]
+    insert_rows(Change, ('model', 'object_id', 'action', 'created_at'), rows, using)
+
+
+def horizon():
+    """The newest ``seq`` dropped by retention (0 if none)."""
+    return SummaryCounter.objects.filter(name=HORIZON).values_list('value', flat=True).first() or 0
+
+
+def raise_horizon(seq):
+    upsert(SummaryCounter.objects, {'name': HORIZON}, {'value': Greatest(F('value'), seq)}, {'value': seq})
+
+
+def sources():
+    """``{model name: (queryset, serializer class)}`` used to serialize entries."""
+    from .serializers import ClientSerializer, EnrollmentSerializer, ProgramSerializer
+
+    return {
+        'client': (Client.objects.order_by(), ClientSerializer),
+        'program': (Program.objects.order_by(), ProgramSerializer),
+        'enrollment': (Enrollment.objects.order_by().select_related('program'), EnrollmentSerializer),
+    }
+
+
+def current_data(entries):
+    """``{(model, object_id): data}`` for the entries' objects that still exist; one query per model."""
+    wanted = defaultdict(set)
+    for entry in entries:
+        if entry.action != 'delete':
+            wanted[entry.model].add(entry.object_id)
+    data = {}
+    for name, (queryset, serializer_class) in sources().items():
+        if wanted[name]:
+            rows = serializer_class(queryset.filter(pk__in=wanted[name]), many=True).data
+            data.update(((name, row['id']), row) for row in rows)
+    return data
+
+
+def read_changes(since=0, limit=DEFAULT_LIMIT):
+    """
+    Up to ``limit`` entries after ``since`` with their objects' current data.
+
+    Entries carry no payload: an object deleted since has ``data: null`` and
+    is followed by its ``delete``, so consumers apply creates and updates as
+    upserts. ``next`` is the cursor for the following page; with ``reset``
+    set the cursor is below the horizon and may have missed deletes, so the
+    consumer discards its copy and starts over from ``next`` (0).
+    """
+    if since and since < horizon():
+        return {'changes': [], 'next': 0, 'has_more': True, 'reset': True}
+
+    entries = list(Change.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    settle = getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 0)
+    if settle:
+        # A transaction that commits late can leave a gap below newer
+        # entries; stop before entries young enough to still have one
+        cutoff = timezone.now() - datetime.timedelta(seconds=settle)
+        for index, entry in enumerate(entries):
+            if entry.created_at > cutoff:
+                entries, has_more = entries[:index], True
+                break
+
+    data = current_data(entries)
+    return {
+        'changes': [
+            {
+                'seq': entry.seq,
+                'model': entry.model,
+                'id': entry.object_id,
+                'action': entry.action,
+                'data': data.get((entry.model, entry.object_id)),
+            }
+            for entry in entries
+        ],
+        'next': entries[-1].seq if entries else since,
+        'has_more': has_more,
+        'reset': False,
+    }
+
+
+def compact(batch_size=COMPACT_BATCH_SIZE):
+    """Drop entries superseded by a later entry for the same object, one ``seq`` window at a time."""
+    later = Change.objects.filter(model=OuterRef('model'), object_id=OuterRef('object_id'), seq__gt=OuterRef('seq'))
+    bounds = Change.objects.aggregate(first=Min('seq'), last=Max('seq'))
+    if bounds['first'] is None:
+        return 0
+    removed = 0
+    for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+        with transaction.atomic():
+            window = Change.objects.filter(seq__gte=start, seq__lt=start + batch_size)
+            removed += window.filter(Exists(later)).delete()[0]
+    return removed
+
+
+@transaction.atomic
+def expire(retention_days):
+    """Drop tombstones older than ``retention_days`` and raise the horizon past them."""
+    cutoff = timezone.now() - datetime.timedelta(days=retention_days)
+    tombstones = Change.objects.filter(action='delete', created_at__lt=cutoff)
+    newest = tombstones.aggregate(newest=Max('seq'))['newest']
+    if newest is None:
+        return 0
+    raise_horizon(newest)
+    return tombstones.filter(seq__lte=newest).delete()[0]
+
+
+def prune(retention_days=None):
+    """
+    Compact the log, then expire old tombstones; returns ``(compacted, expired)``.
+
+    Compaction leaves one entry per live object plus the delete tombstones,
+    so reading the feed from ``since=0`` is a full snapshot.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'CHANGE_FEED_RETENTION_DAYS', 30)
+    return compact(), expire(retention_days)
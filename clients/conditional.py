@@ -0,0 +1,127 @@
+"""
+Conditional GET support (``ETag``/``If-None-Match`` and
+``Last-Modified``/``If-Modified-Since``).
+
+Validators come from one small query (change stamps for lists, ``updated_at``
+columns for objects), so a request whose copy is current gets a 304 before
+the page is fetched or anything is serialized. Responses carry
+``Cache-Control: private, no-cache`` so browsers always revalidate.
+"""
+import datetime
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .versions import stamp_time, stamps
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def latest(values):
+    return max((value for value in values if value is not None), default=None)
+
+
+def list_validators(stamp_values, day=None):
+    """
+    ``(parts, last_modified)`` of a list from its change stamps. A list that
+    also depends on the date (``day``, e.g. filtered by age) changes at
+    midnight, so the day is hashed in and ``last_modified`` is at least its
+    start.
+    """
+    last_modified = latest(stamp_values)
+    last_modified = stamp_time(last_modified) if last_modified else None
+    if day is None:
+        return list(stamp_values), last_modified
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return [*stamp_values, day.isoformat()], max(filter(None, (last_modified, start)))
+
+
+def conditional_response(request, parts, last_modified, render):
+    """
+    Answer 304 when the request's validators match, else ``render()``.
+
+    ``parts`` is hashed with the URL and negotiated media type into the
+    ETag, which takes precedence over ``last_modified`` (a datetime or
+    ``None``) as per RFC 9110.
+    """
+    etag, timestamp, response = _check_validators(request, parts, last_modified)
+    if response is None:
+        response = render()
+    return _set_validators(response, etag, timestamp)
+
+
+async def aconditional_response(request, parts, last_modified, render):
+    """``conditional_response`` for async views; ``render`` is a coroutine function."""
+    etag, timestamp, response = _check_validators(request, parts, last_modified)
+    if response is None:
+        response = await render()
+    return _set_validators(response, etag, timestamp)
+
+
+def _check_validators(request, parts, last_modified):
+    etag = make_etag(request.get_full_path(), getattr(request, 'accepted_media_type', None), *parts)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _set_validators(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Conditional ``list`` and ``retrieve`` for a model viewset.
+
+    Lists are validated by the change stamps of ``conditional_models`` (the
+    viewset's model by default; add related models whose data the list
+    shows, or override ``get_conditional_models`` when that depends on the
+    request), objects by the ``conditional_fields`` of their row. Lists whose
+    rows depend on today's date return it from ``get_conditional_date``. The
+    values read are left in ``self.validators`` for ``ResponseCacheMixin``.
+    """
+    conditional_models = None
+    conditional_fields = ('updated_at',)
+
+    def get_conditional_models(self):
+        return self.conditional_models or [self.get_queryset().model]
+
+    def get_conditional_date(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        values, last_modified = list_validators(
+            stamps(*self.get_conditional_models()), self.get_conditional_date()
+        )
+        self.validators = values
+        return conditional_response(
+            request, values, last_modified,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            values = (
+                self.get_queryset().order_by()
+                .filter(**{self.lookup_field: lookup})
+                .values_list(*self.conditional_fields).first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            values = None
+        render = lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        if values is None:
+            # Let retrieve() raise the 404
+            return render()
+        self.validators = values
+        return conditional_response(request, values, latest(values), render)
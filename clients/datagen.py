@@ -0,0 +1,173 @@
+"""
+Deterministic synthetic data for load testing.
+
+Clients are generated in fixed-size shards; every shard draws from its own
+``random.Random`` seeded with ``(seed, shard)``, so the generated content
+depends only on the seed and not on how many worker processes run the
+shards. Each shard inserts its clients, then enrolls them into programs
+picked with a Zipf-like popularity skew.
+"""
+import datetime
+import random
+
+from django.db import connections, transaction
+
+from .bulk import insert_clients, insert_enrollments
+from .changes import log_changes
+from .models import Client, Enrollment, Program
+from .versions import touch
+
+FIRST_NAMES = [
+    'Achieng', 'Akinyi', 'Amina', 'Baraka', 'Brian', 'Chebet', 'Daniel', 'David', 'Esther', 'Faith',
+    'Grace', 'Hassan', 'Irene', 'James', 'Jane', 'John', 'Joseph', 'Kamau', 'Kevin', 'Lucy',
+    'Mary', 'Mercy', 'Michael', 'Mohamed', 'Naliaka', 'Njeri', 'Omondi', 'Peter', 'Rose', 'Ruth',
+    'Samuel', 'Sarah', 'Stephen', 'Wanjiku', 'Wafula', 'Zawadi',
+]
+LAST_NAMES = [
+    'Abdi', 'Atieno', 'Brown', 'Cheruiyot', 'Doe', 'Gitau', 'Hassan', 'Johnson', 'Kamau', 'Kariuki',
+    'Kibet', 'Kiprop', 'Kimani', 'Langat', 'Maina', 'Mohamed', 'Mutua', 'Mwangi', 'Njoroge', 'Ochieng',
+    'Odhiambo', 'Omondi', 'Onyango', 'Otieno', 'Smith', 'Wafula', 'Wambui', 'Wanjala', 'Williams',
+]
+PROGRAM_NAMES = [
+    'Tuberculosis Control Program', 'Malaria Prevention Program', 'HIV/AIDS Support Program',
+    'Maternal Health Program', 'Diabetes Management Program', 'Child Immunization Program',
+    'Hypertension Care Program', 'Nutrition Support Program', 'Mental Health Program',
+    'Family Planning Program', 'Cancer Screening Program', 'Eye Care Program',
+]
+GENDERS = (('F', 0.5), ('M', 0.48), ('O', 0.02))
+DEFAULT_STATUS_MIX = {'active': 0.6, 'completed': 0.3, 'terminated': 0.1}
+# Fixed rather than today, so a seed generates the same data on any day
+DEFAULT_END_DATE = datetime.date(2025, 12, 31)
+
+
+def create_programs(count):
+    programs = []
+    for index in range(count):
+        name = PROGRAM_NAMES[index % len(PROGRAM_NAMES)]
+        if index >= len(PROGRAM_NAMES):
+            name = f'{name} {index // len(PROGRAM_NAMES) + 1}'
+        programs.append(Program(name=name, description=f'Synthetic {name.lower()}.'))
+    programs = Program.objects.bulk_create(programs)
+    touch(Program)
+    log_changes(Program, [program.pk for program in programs], 'create')
+    return programs
+
+
+def popularity_weights(count, skew):
+    """Zipf-like weights: program ``i`` is ``(i + 1) ** skew`` times rarer than the first."""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def generate_shard(shard, first, size, options):
+    """
+    Generate and insert clients ``first`` to ``first + size`` and their enrollments.
+
+    ``options`` is a plain dict (it crosses process boundaries) with the keys
+    ``seed``, ``program_ids``, ``weights``, ``enrollments_per_client``,
+    ``status_mix``, ``start_date``, ``end_date`` and ``batch_size``.
+    Returns ``(clients, enrollments)`` inserted.
+    """
+    rng = random.Random(f"{options['seed']}:{shard}")
+    start, end = options['start_date'], options['end_date']
+    span = max((end - start).days, 0)
+    statuses = list(options['status_mix'])
+    status_weights = list(options['status_mix'].values())
+    program_ids = options['program_ids']
+    batch_size = options['batch_size']
+
+    total_clients = total_enrollments = 0
+    for offset in range(0, size, batch_size):
+        clients = []
+        for number in range(first + offset, first + min(offset + batch_size, size)):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            clients.append(Client(
+                first_name=first_name,
+                last_name=last_name,
+                date_of_birth=end - datetime.timedelta(days=rng.randint(0, 90 * 365)),
+                gender=rng.choices([g for g, _ in GENDERS], [w for _, w in GENDERS])[0],
+                contact_number='07' + ''.join(rng.choices('0123456789', k=8)),
+                email=f'{first_name}.{last_name}{number}@example.com'.lower(),
+                address=f'{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Road',
+            ))
+
+        enrollments = []
+        with transaction.atomic():
+            insert_clients(clients)
+            for client in clients:
+                wanted = min(len(program_ids), _enrollment_count(rng, options['enrollments_per_client']))
+                chosen = set()
+                while len(chosen) < wanted:
+                    chosen.add(rng.choices(program_ids, options['weights'])[0])
+                for program_id in sorted(chosen):
+                    enrollments.append(Enrollment(
+                        client_id=client.pk,
+                        program_id=program_id,
+                        enrollment_date=start + datetime.timedelta(days=rng.randint(0, span)),
+                        status=rng.choices(statuses, status_weights)[0],
+                    ))
+            insert_enrollments(enrollments)
+        total_clients += len(clients)
+        total_enrollments += len(enrollments)
+    return total_clients, total_enrollments
+
+
+def _enrollment_count(rng, mean):
+    # Geometric-ish: most clients have few enrollments, a long tail has many
+    count = 0
+    while rng.random() < mean / (mean + 1):
+        count += 1
+    return count
+
+
+def _run_shard(args):
+    return generate_shard(*args)
+
+
+def generate(clients, programs, seed=0, workers=1, shard_size=50000, skew=1.0,
+             enrollments_per_client=1.5, status_mix=None, start_date=None, end_date=None,
+             batch_size=5000, progress=None):
+    """
+    Create ``programs`` programs and ``clients`` clients with enrollments.
+
+    ``progress`` is called with ``(clients_done, enrollments_done)`` after
+    each shard. With ``workers > 1`` shards run in forked processes, each
+    with its own database connection.
+    """
+    end_date = end_date or DEFAULT_END_DATE
+    start_date = start_date or end_date - datetime.timedelta(days=5 * 365)
+    program_ids = [program.pk for program in create_programs(programs)]
+    options = {
+        'seed': seed,
+        'program_ids': program_ids,
+        'weights': popularity_weights(len(program_ids), skew),
+        'enrollments_per_client': enrollments_per_client if program_ids else 0,
+        'status_mix': status_mix or DEFAULT_STATUS_MIX,
+        'start_date': start_date,
+        'end_date': end_date,
+        'batch_size': batch_size,
+    }
+    shards = [
+        (shard, shard * shard_size, min(shard_size, clients - shard * shard_size), options)
+        for shard in range((clients + shard_size - 1) // shard_size)
+    ]
+
+    done_clients = done_enrollments = 0
+    if workers > 1:
+        import multiprocessing
+        # Children must not share the parent's open connections
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            results = pool.imap_unordered(_run_shard, shards)
+            for shard_clients, shard_enrollments in results:
+                done_clients += shard_clients
+                done_enrollments += shard_enrollments
+                if progress:
+                    progress(done_clients, done_enrollments)
+    else:
+        for args in shards:
+            shard_clients, shard_enrollments = _run_shard(args)
+            done_clients += shard_clients
+            done_enrollments += shard_enrollments
+            if progress:
+                progress(done_clients, done_enrollments)
+    return done_clients, done_enrollments
@@ -0,0 +1,259 @@
+"""
+Duplicate client detection.
+
+Comparing every client with every other is quadratic, so each client gets
+a few blocking keys in ``ClientMatchKey`` and only clients sharing a key
+(a block) are compared:
+
+- ``name``: normalized last name and birth year;
+- ``sound``: Soundex codes of the first and last name, so spelling
+  variants of both names meet;
+- ``phone``: the last ``PHONE_DIGITS`` digits of the contact number, so
+  national and international forms of a number meet.
+
+Candidates are scored by ``score`` (0 to 1) from name similarity, date of
+birth, phone, email and gender. ``find_duplicates`` checks one client
+against its blocks with one indexed query per block, before a create;
+``DuplicateScan`` (``manage.py find_duplicates``) streams the whole key
+index in key order and scores every block once, in memory bounded by the
+block size. Blocks larger than ``max_block_size`` (a placeholder phone
+number, a very common name) say little about identity and are skipped.
+"""
+import datetime
+import difflib
+import re
+from itertools import combinations, groupby
+
+from django.conf import settings
+
+from .indexing import ClientIndex
+from .search import normalize, tokenize
+
+NAME, SOUND, PHONE = 'name', 'sound', 'phone'
+KINDS = (NAME, SOUND, PHONE)
+# Blocks read by the pre-create check, most specific first
+CANDIDATE_KINDS = (PHONE, NAME, SOUND)
+MATCH_FIELDS = ('first_name', 'last_name', 'date_of_birth', 'contact_number')
+MAX_NAME_LENGTH = 50
+PHONE_DIGITS = 9
+MIN_PHONE_DIGITS = 7
+MAX_CANDIDATES = 200
+MAX_BLOCK_SIZE = 200
+SCAN_BATCH_SIZE = 2000
+WEIGHTS = {
+    'first_name': 0.3,
+    'last_name': 0.3,
+    'date_of_birth': 0.2,
+    'contact_number': 0.1,
+    'email': 0.05,
+    'gender': 0.05,
+}
+
+_SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'))
+    for letter in letters
+}
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
+def threshold():
+    return getattr(settings, 'DUPLICATE_MATCH_THRESHOLD', 0.8)
+
+
+def normalize_name(value):
+    return ''.join(tokenize(value))
+
+
+def normalize_phone(value):
+    digits = _NON_DIGIT_RE.sub('', value or '')
+    return digits[-PHONE_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else ''
+
+
+def soundex(value):
+    letters = [c for c in normalize(value) if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code, previous = letters[0], _SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            # Vowels separate repeated codes; h and w do not
+            previous = digit
+    return (code + '000')[:4]
+
+
+def _date(value):
+    # Instances created with a string date keep it until reloaded
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def client_keys(client):
+    """``{kind: key}`` for ``client``; kinds whose fields are blank are left out."""
+    keys = {}
+    last_name = normalize_name(client.last_name)[:MAX_NAME_LENGTH]
+    birth_date = _date(client.date_of_birth)
+    if last_name and birth_date:
+        keys[NAME] = f'{last_name}:{birth_date.year}'
+    codes = soundex(client.first_name), soundex(client.last_name)
+    if all(codes):
+        keys[SOUND] = ''.join(codes)
+    phone = normalize_phone(client.contact_number)
+    if phone:
+        keys[PHONE] = phone
+    return keys
+
+
+def key_rows(client):
+    return client_keys(client).items()
+
+
+MATCH_KEY_INDEX = ClientIndex('ClientMatchKey', ('kind', 'key'), key_rows, MATCH_FIELDS)
+
+
+def index_match_keys(clients, replace=True):
+    """(Re)build the blocking keys of ``clients`` (see ``bulk`` for bulk inserts)."""
+    MATCH_KEY_INDEX.update(clients, replace)
+
+
+def similarity(value, other):
+    if not value or not other:
+        return 0.0
+    if value == other:
+        return 1.0
+    return difflib.SequenceMatcher(None, value, other).ratio()
+
+
+def match_fields(client):
+    """The normalized fields ``compare`` reads, computed once per client."""
+    return (
+        normalize_name(client.first_name),
+        normalize_name(client.last_name),
+        _date(client.date_of_birth),
+        normalize_phone(client.contact_number),
+        (client.email or '').strip().lower(),
+        client.gender,
+    )
+
+
+def compare(fields, other, min_score=0.0):
+    """
+    Score two ``match_fields`` tuples. Names are compared last, and not at
+    all when even identical names could not reach ``min_score`` (0 is
+    returned then).
+    """
+    first_name, last_name, birth_date, phone, email, gender = fields
+    if birth_date == other[2]:
+        value = WEIGHTS['date_of_birth']
+    elif birth_date and other[2] and birth_date.year == other[2].year:
+        value = WEIGHTS['date_of_birth'] / 2
+    else:
+        value = 0.0
+    value += WEIGHTS['contact_number'] * bool(phone and phone == other[3])
+    value += WEIGHTS['email'] * bool(email and email == other[4])
+    value += WEIGHTS['gender'] * (gender == other[5])
+    if value + WEIGHTS['first_name'] + WEIGHTS['last_name'] < min_score:
+        return 0.0
+    value += WEIGHTS['first_name'] * similarity(first_name, other[0])
+    value += WEIGHTS['last_name'] * similarity(last_name, other[1])
+    return round(value, 3)
+
+
+def score(client, other):
+    """How likely two clients are the same person, from 0 to 1."""
+    return compare(match_fields(client), match_fields(other))
+
+
+def candidates(client, limit=None):
+    """
+    Clients sharing a block with ``client`` (saved or not), up to ``limit``
+    from each block. The most telling blocks are read first, so a large
+    ``sound`` block cannot crowd out a phone or name match.
+    """
+    from .models import Client, ClientMatchKey
+
+    limit = limit or MAX_CANDIDATES
+    keys = client_keys(client)
+    found = {}
+    for kind in CANDIDATE_KINDS:
+        if kind not in keys:
+            continue
+        matches = ClientMatchKey.objects.filter(kind=kind, key=keys[kind]).values('client_id')
+        queryset = Client.objects.filter(pk__in=matches).order_by('pk')
+        if client.pk is not None:
+            queryset = queryset.exclude(pk=client.pk)
+        for candidate in queryset[:limit]:
+            found.setdefault(candidate.pk, candidate)
+    return list(found.values())
+
+
+def find_duplicates(client, min_score=None):
+    """``[(score, candidate)]`` of likely duplicates of ``client``, best first."""
+    min_score = threshold() if min_score is None else min_score
+    fields = match_fields(client)
+    scored = [(compare(fields, match_fields(candidate), min_score), candidate) for candidate in candidates(client)]
+    return sorted(
+        [(value, candidate) for value, candidate in scored if value >= min_score],
+        key=lambda pair: (-pair[0], pair[1].pk),
+    )
+
+
+class DuplicateScan:
+    """
+    Iterate ``(client_id, duplicate_id, score)`` over all clients.
+
+    A pair sharing several blocks is scored only in the first of them (in
+    ``KINDS`` order), so each is reported once. Counts of the blocks scored
+    and skipped are kept on the instance.
+    """
+
+    def __init__(self, min_score=None, max_block_size=MAX_BLOCK_SIZE, batch_size=SCAN_BATCH_SIZE):
+        self.min_score = threshold() if min_score is None else min_score
+        self.max_block_size = max_block_size
+        self.batch_size = batch_size
+        self.blocks = 0
+        self.skipped = 0
+        self.compared = 0
+
+    def __iter__(self):
+        from .models import ClientMatchKey
+
+        rows = ClientMatchKey.objects.order_by('kind', 'key', 'client_id').values_list('kind', 'key', 'client_id')
+        pending, members = [], 0
+        for (kind, _), block in groupby(rows.iterator(chunk_size=self.batch_size), key=lambda row: row[:2]):
+            client_ids = [client_id for _, _, client_id in block]
+            if len(client_ids) < 2:
+                continue
+            if len(client_ids) > self.max_block_size:
+                self.skipped += 1
+                continue
+            self.blocks += 1
+            pending.append((kind, client_ids))
+            members += len(client_ids)
+            if members >= self.batch_size:
+                yield from self.score_blocks(pending)
+                pending, members = [], 0
+        yield from self.score_blocks(pending)
+
+    def score_blocks(self, blocks):
+        from .models import Client
+
+        client_ids = {client_id for _, block in blocks for client_id in block}
+        rows = Client.objects.filter(pk__in=client_ids).only(*MATCH_FIELDS, 'email', 'gender').order_by()
+        clients = {client.pk: client for client in rows}
+        keys = {pk: client_keys(client) for pk, client in clients.items()}
+        fields = {pk: match_fields(client) for pk, client in clients.items()}
+        for kind, block in blocks:
+            for first, second in combinations([pk for pk in block if pk in clients], 2):
+                if self.first_shared(keys[first], keys[second]) not in (kind, None):
+                    continue
+                self.compared += 1
+                value = compare(fields[first], fields[second], self.min_score)
+                if value >= self.min_score:
+                    yield first, second, value
+
+    def first_shared(self, keys, other):
+        # None when the index is stale for either client
+        return next((kind for kind in KINDS if kind in keys and keys[kind] == other.get(kind)), None)
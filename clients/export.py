@@ -0,0 +1,115 @@
+"""
+Streaming CSV / NDJSON export of list endpoints.
+
+Rows are read with ``values_list().iterator()`` (a server-side cursor on
+Postgres) and written out in fixed-size chunks, optionally gzipped on the
+fly, so memory stays flat whatever the size of the table. Text cells that
+a spreadsheet would read as a formula are prefixed with ``'`` in CSV.
+"""
+import csv
+import datetime
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+
+from .renderers import CSVRenderer, NDJSONRenderer
+
+CHUNK_ROWS = 1000
+# Spreadsheets evaluate text cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    """File-like object that hands csv.writer output straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(headers, rows, chunk_rows=CHUNK_ROWS):
+    writer = csv.writer(_Echo())
+    buffer = [writer.writerow(headers)]
+    for row in rows:
+        buffer.append(writer.writerow([_cell(value) for value in row]))
+        if len(buffer) >= chunk_rows:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def ndjson_chunks(headers, rows, chunk_rows=CHUNK_ROWS):
+    encoder = DjangoJSONEncoder()
+    buffer = []
+    for row in rows:
+        buffer.append(encoder.encode(dict(zip(headers, row))) + '\n')
+        if len(buffer) >= chunk_rows:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(queryset, fields, fmt, filename, compress=False):
+    """
+    Stream ``queryset`` as CSV or NDJSON.
+
+    ``fields`` is a sequence of column names or ``(column, lookup)`` pairs,
+    e.g. ``('program_name', 'program__name')``.
+    """
+    headers = [field[0] if isinstance(field, tuple) else field for field in fields]
+    lookups = [field[1] if isinstance(field, tuple) else field for field in fields]
+    rows = queryset.values_list(*lookups).iterator(chunk_size=CHUNK_ROWS)
+
+    if fmt == 'ndjson':
+        chunks, content_type = ndjson_chunks(headers, rows), 'application/x-ndjson'
+    else:
+        chunks, content_type = csv_chunks(headers, rows), 'text/csv; charset=utf-8'
+    if compress:
+        chunks = gzip_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+
+class ExportMixin:
+    """
+    Adds ``GET <list>/export/`` to a viewset.
+
+    The export honors the viewset's filter backends (search, ordering and
+    any ``get_queryset`` filtering) but skips pagination. Choose the format
+    with ``?format=csv|ndjson`` and compress with ``?gzip=1``.
+    """
+    export_fields = ()
+    export_filename = 'export'
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        return export_response(
+            queryset, self.export_fields, request.accepted_renderer.format,
+            self.export_filename, compress=compress
+        )
@@ -0,0 +1,126 @@
+import datetime
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .search import search_clients
+
+MAX_AGE = 150
+
+
+class ClientSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the client token index instead of ``icontains``.
+
+    Results are ranked by relevance unless the caller asked for an explicit
+    ``order_by``; place this backend after ``OrderingFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        ranked = api_settings.ORDERING_PARAM not in request.query_params
+        return search_clients(queryset, query, ranked=ranked)
+
+
+class ClientCohortFilter(filters.BaseFilterBackend):
+    """The ``filter_clients`` parameters other than ``search`` as list query parameters."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = {name: request.query_params[name] for name in COHORT_PARAMS if name in request.query_params}
+        return filter_clients(queryset, params)
+
+
+# Query parameters understood by filter_clients(), e.g. for cohort enrollment
+COHORT_PARAMS = (
+    'gender', 'min_age', 'max_age', 'created_from', 'created_to', 'program', 'enrollment_status',
+)
+CLIENT_FILTER_PARAMS = ('search',) + COHORT_PARAMS
+# Cohort filters that read enrollments
+ENROLLMENT_PARAMS = ('program', 'enrollment_status')
+# Cohort filters whose matches change with today's date
+AGE_PARAMS = ('min_age', 'max_age')
+
+
+def _parse(params, name, parse, message):
+    try:
+        return parse(params[name])
+    except (TypeError, ValueError):
+        raise ValidationError({name: message})
+
+
+def _age(params, name):
+    age = _parse(params, name, int, 'A valid integer is required.')
+    if not 0 <= age <= MAX_AGE:
+        raise ValidationError({name: f'Ensure this value is between 0 and {MAX_AGE}.'})
+    return age
+
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # 29 February in a common year
+        return day.replace(year=day.year - years, day=28)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def filter_clients(queryset, params):
+    """
+    Apply the client list filters described by ``params`` to ``queryset``.
+
+    Ages are whole years on today's date; ``created_from``/``created_to``
+    are inclusive dates; ``program`` and ``enrollment_status`` keep clients
+    with a matching enrollment. Every filter compares a bare column, so the
+    database can use the indexes on ``(gender, date_of_birth)``,
+    ``date_of_birth`` and ``created_at``, and probe enrollments through the
+    unique ``(client, program)`` index. Invalid values raise
+    ``ValidationError``.
+    """
+    from .models import Client, Enrollment
+
+    search = params.get('search')
+    if search:
+        queryset = search_clients(queryset, search, ranked=False)
+
+    gender = params.get('gender')
+    if gender:
+        if gender.upper() not in dict(Client.GENDER_CHOICES):
+            raise ValidationError({'gender': f'"{gender}" is not a valid choice.'})
+        queryset = queryset.filter(gender=gender.upper())
+
+    today = timezone.localdate()
+    if params.get('min_age'):
+        queryset = queryset.filter(date_of_birth__lte=_years_before(today, _age(params, 'min_age')))
+    if params.get('max_age'):
+        # Born after the day they would have turned max_age + 1
+        queryset = queryset.filter(date_of_birth__gt=_years_before(today, _age(params, 'max_age') + 1))
+
+    date_message = 'Date has wrong format. Use YYYY-MM-DD.'
+    if params.get('created_from'):
+        day = _parse(params, 'created_from', datetime.date.fromisoformat, date_message)
+        queryset = queryset.filter(created_at__gte=_start_of(day))
+    if params.get('created_to'):
+        day = _parse(params, 'created_to', datetime.date.fromisoformat, date_message)
+        queryset = queryset.filter(created_at__lt=_start_of(day + datetime.timedelta(days=1)))
+
+    enrollments = {}
+    if params.get('program'):
+        enrollments['program_id'] = _parse(params, 'program', int, 'A valid integer is required.')
+    status = params.get('enrollment_status')
+    if status:
+        if status not in dict(Enrollment.STATUS_CHOICES):
+            raise ValidationError({'enrollment_status': f'"{status}" is not a valid choice.'})
+        enrollments['status'] = status
+    if enrollments:
+        queryset = queryset.filter(Exists(
+            Enrollment.objects.order_by().filter(client_id=OuterRef('pk'), **enrollments)
+        ))
+    return queryset
@@ -0,0 +1,71 @@
+"""
+Per-client index tables (search tokens, autocomplete name keys, duplicate
+blocking keys), each described by a ``ClientIndex``.
+"""
+from django.apps import apps as global_apps
+from django.db import connections, router
+
+BATCH_SIZE = 2000
+
+
+def insert_rows(model, fields, rows, using=None):
+    """``executemany`` an INSERT of ``rows``, tuples of database values for ``fields``."""
+    if not rows:
+        return
+    connection = connections[using or router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(map(quote, columns)), ', '.join(['%s'] * len(columns))
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class ClientIndex:
+    """
+    A table of rows derived from a few fields of each client: its model, the
+    columns after ``client`` and a row builder returning their values for one
+    client. The model is looked up by name, so the backfill migrations run
+    the same code on historical models.
+    """
+
+    def __init__(self, model_name, fields, build_rows, source_fields):
+        self.model_name = model_name
+        self.fields = fields
+        self.build_rows = build_rows
+        self.source_fields = source_fields
+
+    def model(self, apps=None):
+        return (apps or global_apps).get_model('clients', self.model_name)
+
+    def update(self, clients, replace=True, apps=None, using=None):
+        """(Re)build the rows of ``clients``."""
+        model = self.model(apps)
+        using = using or router.db_for_write(model)
+        clients = list(clients)
+        if replace:
+            model.objects.using(using).filter(client_id__in=[c.pk for c in clients]).delete()
+        rows = [(client.pk, *values) for client in clients for values in self.build_rows(client)]
+        insert_rows(model, ('client', *self.fields), rows, using)
+
+    def rebuild(self, batch_size=BATCH_SIZE, apps=None, using=None):
+        """Rebuild the whole table ``batch_size`` clients at a time; returns the number indexed."""
+        model = self.model(apps)
+        using = using or router.db_for_write(model)
+        model.objects.using(using).all().delete()
+        clients = (apps or global_apps).get_model('clients', 'Client').objects.using(using)
+        batch = []
+        total = 0
+        for client in clients.only(*self.source_fields).order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(client)
+            if len(batch) == batch_size:
+                self.update(batch, replace=False, apps=apps, using=using)
+                total += len(batch)
+                batch = []
+        self.update(batch, replace=False, apps=apps, using=using)
+        return total + len(batch)
+
+    def backfill(self, apps, schema_editor):
+        """``RunPython`` operation filling the table when its migration creates it."""
+        self.rebuild(apps=apps, using=schema_editor.connection.alias)
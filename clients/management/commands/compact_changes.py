@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from clients.changes import prune
+
+
+class Command(BaseCommand):
+    help = 'Drop superseded change feed entries and delete tombstones past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, help='Keep tombstones this long (default: CHANGE_FEED_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        compacted, expired = prune(options['retention_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Dropped {compacted} superseded entries and {expired} expired tombstones'
+        ))
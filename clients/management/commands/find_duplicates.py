@@ -0,0 +1,42 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from clients.duplicates import MATCH_KEY_INDEX, MAX_BLOCK_SIZE, SCAN_BATCH_SIZE, DuplicateScan
+
+
+class Command(BaseCommand):
+    help = 'Write likely duplicate clients as CSV (client_id, duplicate_id, score)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='CSV file to write (default: stdout)')
+        parser.add_argument('--min-score', type=float, help='Default: DUPLICATE_MATCH_THRESHOLD')
+        parser.add_argument('--max-block-size', type=int, default=MAX_BLOCK_SIZE,
+                            help='Skip blocking keys shared by more clients than this')
+        parser.add_argument('--batch-size', type=int, default=SCAN_BATCH_SIZE)
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the blocking keys first')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            MATCH_KEY_INDEX.rebuild(options['batch_size'])
+
+        scan = DuplicateScan(options['min_score'], options['max_block_size'], options['batch_size'])
+        handle = open(options['output'], 'w', newline='') if options['output'] else None
+        try:
+            writer = csv.writer(handle or self.stdout)
+            writer.writerow(['client_id', 'duplicate_id', 'score'])
+            found = 0
+            for row in scan:
+                writer.writerow(row)
+                found += 1
+        finally:
+            if handle:
+                handle.close()
+
+        # Keep stdout for the CSV when no file is given
+        report = self.stdout if handle else self.stderr
+        report.write(
+            f'Found {found} likely duplicates in {scan.compared} comparisons '
+            f'({scan.blocks} blocks, {scan.skipped} over {options["max_block_size"]} clients skipped)',
+            style_func=self.style.SUCCESS,
+        )
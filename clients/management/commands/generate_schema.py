@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from health_system.schema import generate_schema
+
+
+class Command(BaseCommand):
+    help = 'Write the OpenAPI schema to a file served by /swagger.json (see SCHEMA_FILE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Defaults to the SCHEMA_FILE setting')
+        parser.add_argument('--format', choices=['json', 'yaml'], default='json')
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.SCHEMA_FILE
+        if not path:
+            raise CommandError('Pass --output or set SCHEMA_FILE')
+        if options['format'] != 'json' and not options['output']:
+            # SCHEMA_FILE is served as /swagger.json
+            raise CommandError('SCHEMA_FILE holds the JSON schema; pass --output for other formats')
+        content = generate_schema(options['format'])
+        with open(path, 'wb') as handle:
+            handle.write(content)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(content)} bytes to {path}'))
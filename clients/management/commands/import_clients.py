@@ -0,0 +1,256 @@
+import csv
+import datetime
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clients.bulk import insert_clients, insert_enrollments, validate_rows
+from clients.changes import log_changes
+from clients.models import Client, Enrollment, ImportCheckpoint, Program
+from clients.serializers import ClientSerializer
+from clients.versions import touch
+
+STATUSES = {value for value, _ in Enrollment.STATUS_CHOICES}
+DB_ID_PREFIX = 'db:'
+
+
+def read_records(path):
+    """Yield dicts from a CSV (header row) or NDJSON (.ndjson/.jsonl) file."""
+    if path.endswith(('.ndjson', '.jsonl')):
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as handle:
+            yield from csv.DictReader(handle)
+
+
+def batches(records, size, skip=0):
+    batch = []
+    for number, record in enumerate(records):
+        if number < skip:
+            continue
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import programs, clients and enrollments from CSV or NDJSON files. '
+        'Enrollment rows reference clients by the "id" column of the clients file '
+        '(or by database id written as "db:<id>") and programs by name, source id or database id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programs', help='Programs file (name, description[, id])')
+        parser.add_argument('--clients', help='Clients file (client fields[, id])')
+        parser.add_argument('--enrollments', help='Enrollments file (client, program, enrollment_date[, status, notes])')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Record progress under this name; rerunning with the same name resumes'
+        )
+        parser.add_argument(
+            '--client-map',
+            help='File keeping source client ids -> database ids, needed when resuming '
+                 'enrollments that reference clients imported by an earlier run'
+        )
+        parser.add_argument('--errors', help='Write rejected rows to this NDJSON file')
+
+    def handle(self, *args, **options):
+        if not any(options[kind] for kind in ('programs', 'clients', 'enrollments')):
+            raise CommandError('Nothing to import: pass --programs, --clients and/or --enrollments')
+        for kind in ('programs', 'clients', 'enrollments'):
+            if options[kind] and not os.path.exists(options[kind]):
+                raise CommandError(f'{options[kind]} does not exist')
+
+        self.batch_size = options['batch_size']
+        self.checkpoint_name = options['checkpoint']
+        self.client_map_path = options['client_map']
+        self.errors_file = open(options['errors'], 'a', encoding='utf-8') if options['errors'] else None
+        self.rejected = 0
+
+        self.program_sources = {}
+        self.program_names = {}
+        self.program_pks = set()
+        for pk, name in Program.objects.values_list('pk', 'name'):
+            self.program_pks.add(pk)
+            self.program_names.setdefault(name, pk)
+        self.client_ids = self.load_client_map()
+
+        try:
+            if options['programs']:
+                # Programs are few and matched by name; always reread them so the
+                # source id lookup is complete even when resuming
+                self.import_file('programs', options['programs'], self.import_programs, resumable=False)
+            if options['clients']:
+                self.import_file('clients', options['clients'], self.import_clients)
+            if options['enrollments']:
+                self.import_file('enrollments', options['enrollments'], self.import_enrollments)
+        finally:
+            if self.errors_file:
+                self.errors_file.close()
+
+        if self.rejected:
+            self.stdout.write(self.style.WARNING(f'{self.rejected} rows rejected'))
+
+    def load_client_map(self):
+        client_ids = {}
+        if self.client_map_path and os.path.exists(self.client_map_path):
+            with open(self.client_map_path, encoding='utf-8') as handle:
+                for line in handle:
+                    source_id, pk = line.rstrip('\n').rsplit(',', 1)
+                    client_ids[source_id] = int(pk)
+        return client_ids
+
+    def get_checkpoint(self, kind):
+        if not self.checkpoint_name:
+            return None
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=f'{self.checkpoint_name}:{kind}')
+        return checkpoint
+
+    def import_file(self, kind, path, import_batch, resumable=True):
+        checkpoint = self.get_checkpoint(kind) if resumable else None
+        done = checkpoint.rows_done if checkpoint else 0
+        if done:
+            self.stdout.write(f'{kind}: resuming after {done} rows')
+
+        started = time.monotonic()
+        imported = 0
+        for batch in batches(read_records(path), self.batch_size, skip=done):
+            with transaction.atomic():
+                imported += import_batch(batch, first_row=done)
+                done += len(batch)
+                if checkpoint:
+                    checkpoint.rows_done = done
+                    checkpoint.save(update_fields=['rows_done', 'updated_at'])
+            rate = imported / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{kind}: {done} rows read, {imported} imported ({rate:.0f} rows/s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind}: imported {imported} rows in {time.monotonic() - started:.1f}s'
+        ))
+
+    def reject(self, kind, row_number, record, errors):
+        self.rejected += 1
+        if self.errors_file:
+            self.errors_file.write(json.dumps(
+                {'file': kind, 'row': row_number, 'record': record, 'errors': errors}, default=str
+            ) + '\n')
+
+    def import_programs(self, batch, first_row):
+        pending = {}
+        for offset, record in enumerate(batch):
+            name = (record.get('name') or '').strip()
+            if not name:
+                self.reject('programs', first_row + offset, record, {'name': ['This field is required.']})
+                continue
+            source_id = str(record.get('id') or '').strip()
+            if name in self.program_names:
+                if source_id:
+                    self.program_sources[source_id] = self.program_names[name]
+                continue
+            program, source_ids = pending.setdefault(
+                name, (Program(name=name, description=record.get('description') or ''), [])
+            )
+            if source_id:
+                source_ids.append(source_id)
+
+        Program.objects.bulk_create([program for program, _ in pending.values()])
+        if pending:
+            touch(Program)
+            log_changes(Program, [program.pk for program, _ in pending.values()], 'create')
+        for name, (program, source_ids) in pending.items():
+            self.program_names[name] = program.pk
+            self.program_pks.add(program.pk)
+            for source_id in source_ids:
+                self.program_sources[source_id] = program.pk
+        return len(pending)
+
+    def import_clients(self, batch, first_row):
+        valid, errors = validate_rows(batch, ClientSerializer)
+        for error in errors:
+            self.reject('clients', first_row + error['index'], batch[error['index']], error['errors'])
+
+        clients = insert_clients([Client(**data) for _, data in valid])
+        mapping = [
+            (str(batch[index]['id']), client.pk)
+            for (index, _), client in zip(valid, clients)
+            if batch[index].get('id') not in (None, '')
+        ]
+        if mapping and self.client_map_path:
+            # Written before the batch commits; on a crash the rerun rewrites these ids
+            with open(self.client_map_path, 'a', encoding='utf-8') as handle:
+                handle.writelines(f'{source_id},{pk}\n' for source_id, pk in mapping)
+        self.client_ids.update(mapping)
+        return len(clients)
+
+    def resolve_program(self, value):
+        value = str(value or '').strip()
+        if value in self.program_sources:
+            return self.program_sources[value]
+        if value in self.program_names:
+            return self.program_names[value]
+        if value.isdigit() and int(value) in self.program_pks:
+            return int(value)
+        return None
+
+    def resolve_client(self, value):
+        # Source ids and database ids can both be numeric; a bare id is only
+        # ever looked up in the client map, never taken as a database id
+        value = str(value or '').strip()
+        if value in self.client_ids:
+            return self.client_ids[value]
+        if value.startswith(DB_ID_PREFIX) and value[len(DB_ID_PREFIX):].isdigit():
+            return int(value[len(DB_ID_PREFIX):])
+        return None
+
+    def import_enrollments(self, batch, first_row):
+        resolved = []
+        for offset, record in enumerate(batch):
+            errors = {}
+            client_id = self.resolve_client(record.get('client'))
+            program_id = self.resolve_program(record.get('program'))
+            status = record.get('status') or 'active'
+            enrollment_date = None
+            if client_id is None:
+                errors['client'] = [
+                    f'Unknown client. Database ids are written "{DB_ID_PREFIX}<id>".'
+                    if str(record.get('client') or '').strip().isdigit() else 'Unknown client.'
+                ]
+            if program_id is None:
+                errors['program'] = ['Unknown program.']
+            if status not in STATUSES:
+                errors['status'] = [f'"{status}" is not a valid choice.']
+            try:
+                enrollment_date = datetime.date.fromisoformat(str(record.get('enrollment_date')))
+            except ValueError:
+                errors['enrollment_date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+            if errors:
+                self.reject('enrollments', first_row + offset, record, errors)
+                continue
+            resolved.append((offset, Enrollment(
+                client_id=client_id, program_id=program_id, enrollment_date=enrollment_date,
+                status=status, notes=record.get('notes') or ''
+            )))
+
+        # "db:" ids are not in the map and must still exist in the database
+        existing = set(Client.objects.filter(
+            pk__in={enrollment.client_id for _, enrollment in resolved}
+        ).values_list('pk', flat=True))
+        enrollments = []
+        for offset, enrollment in resolved:
+            if enrollment.client_id in existing:
+                enrollments.append(enrollment)
+            else:
+                self.reject('enrollments', first_row + offset, batch[offset], {'client': ['Unknown client.']})
+        return len(insert_enrollments(enrollments))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from clients.models import ProgramStatusCount, SummaryCounter
+from clients.summary import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard summary counters from the client and enrollment tables'
+
+    def handle(self, *args, **options):
+        rebuild_counters()
+        clients = SummaryCounter.objects.get(name='clients').value
+        enrollments = sum(ProgramStatusCount.objects.values_list('count', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Counted {clients} clients and {enrollments} enrollments'))
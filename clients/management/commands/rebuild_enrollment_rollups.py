@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from clients.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and monthly enrollment rollups from the enrollment table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--program', type=int, action='append', help='Only rebuild this program id (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups(options['program'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} rollup rows'))
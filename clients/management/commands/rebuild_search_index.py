@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from clients.search import TOKEN_INDEX
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the client search token index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = TOKEN_INDEX.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} clients'))
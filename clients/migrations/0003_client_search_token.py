@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from clients.search import TOKEN_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='clients.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'position', 'client'], name='client_search_token_idx')],
+            },
+        ),
+        migrations.RunPython(TOKEN_INDEX.backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['program', '-enrollment_date', 'id'], name='enrollment_program_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['program', 'status', '-enrollment_date', 'id'], name='enrollment_prog_status_idx'),
+        ),
+    ]
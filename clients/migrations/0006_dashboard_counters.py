@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    Enrollment = apps.get_model('clients', 'Enrollment')
+    SummaryCounter = apps.get_model('clients', 'SummaryCounter')
+    ProgramStatusCount = apps.get_model('clients', 'ProgramStatusCount')
+    SummaryCounter.objects.create(name='clients', value=Client.objects.count())
+    ProgramStatusCount.objects.bulk_create([
+        ProgramStatusCount(program_id=row['program_id'], status=row['status'], count=row['count'])
+        for row in Enrollment.objects.order_by().values('program_id', 'status').annotate(count=Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0005_program_roster_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProgramStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('terminated', 'Terminated')], max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counts', to='clients.program')),
+            ],
+            options={
+                'unique_together': {('program', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
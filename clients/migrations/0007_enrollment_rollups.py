@@ -0,0 +1,48 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Enrollment = apps.get_model('clients', 'Enrollment')
+    EnrollmentRollup = apps.get_model('clients', 'EnrollmentRollup')
+    for interval, period in (('day', F('enrollment_date')), ('month', TruncMonth('enrollment_date'))):
+        rows = (
+            Enrollment.objects.order_by().annotate(period=period)
+            .values('program_id', 'period', 'status').annotate(count=Count('id'))
+        )
+        EnrollmentRollup.objects.bulk_create([
+            EnrollmentRollup(
+                program_id=row['program_id'], interval=interval, period=row['period'],
+                status=row['status'], count=row['count'],
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0006_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period', models.DateField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('terminated', 'Terminated')], max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='clients.program')),
+            ],
+            options={
+                'unique_together': {('program', 'interval', 'period', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
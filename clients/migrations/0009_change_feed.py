@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+
+def backfill_changes(apps, schema_editor):
+    # Existing rows enter the feed as creates; programs and clients first,
+    # so a consumer replaying it meets an enrollment's client and program
+    # before the enrollment
+    Change = apps.get_model('clients', 'Change')
+    for model_name in ('Program', 'Client', 'Enrollment'):
+        ids = apps.get_model('clients', model_name).objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=5000):
+            batch.append(Change(model=model_name.lower(), object_id=pk, action='create'))
+            if len(batch) == 5000:
+                Change.objects.bulk_create(batch)
+                batch = []
+        Change.objects.bulk_create(batch)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id', 'seq'], name='change_object_seq_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
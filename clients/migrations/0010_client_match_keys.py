@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from clients.duplicates import MATCH_KEY_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0009_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('name', 'Last name and birth year'), ('sound', 'Phonetic name'), ('phone', 'Phone number')], max_length=5)),
+                ('key', models.CharField(max_length=64)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='clients.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'key', 'client'], name='client_match_key_idx')],
+            },
+        ),
+        migrations.RunPython(MATCH_KEY_INDEX.backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+from clients.models import digits_only, normalize_email
+
+
+def backfill_contacts(apps, schema_editor):
+    Client = apps.get_model('clients', 'Client')
+    clients = Client.objects.only('contact_number', 'email').order_by('pk')
+    batch = []
+    for client in clients.iterator(chunk_size=2000):
+        client.phone_digits = digits_only(client.contact_number)
+        client.email_lower = normalize_email(client.email)
+        batch.append(client)
+        if len(batch) == 2000:
+            Client.objects.bulk_update(batch, ['phone_digits', 'email_lower'])
+            batch = []
+    Client.objects.bulk_update(batch, ['phone_digits', 'email_lower'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0010_client_match_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='email_lower',
+            field=models.CharField(default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_contacts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['phone_digits'], name='client_phone_digits_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['email_lower'], name='client_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from clients.autocomplete import NAME_KEY_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0011_client_contact_lookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientNameKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('display', models.CharField(max_length=201)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_keys', to='clients.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'client', 'display'], name='client_name_key_idx')],
+            },
+        ),
+        migrations.RunPython(NAME_KEY_INDEX.backfill, migrations.RunPython.noop),
+    ]
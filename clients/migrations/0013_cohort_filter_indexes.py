@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0012_client_name_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['gender', 'date_of_birth'], name='client_gender_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['date_of_birth'], name='client_dob_idx'),
+        ),
+    ]
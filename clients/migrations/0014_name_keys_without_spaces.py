@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from clients.autocomplete import NAME_KEY_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0013_cohort_filter_indexes'),
+    ]
+
+    operations = [
+        # Name keys no longer contain spaces; rebuild the stored ones
+        migrations.RunPython(NAME_KEY_INDEX.backfill, migrations.RunPython.noop),
+    ]
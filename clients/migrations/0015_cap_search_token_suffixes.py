@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from clients.search import TOKEN_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0014_name_keys_without_spaces'),
+    ]
+
+    operations = [
+        # Emails no longer store suffixes and names store at most MAX_SUFFIXES
+        migrations.RunPython(TOKEN_INDEX.backfill, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,21 @@
-from django.db import models
+import re
+
+from django.db import models, transaction
+
+
+def digits_only(value):
+    return re.sub(r'\D', '', value or '')
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
 
 class Program(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']  # Add default ordering
@@ -26,9 +38,38 @@ class Client(models.Model):
     email = models.EmailField()
     address = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Normalized copies of contact_number and email for exact lookups,
+    # filled in by save() and by the bulk insert helpers
+    phone_digits = models.CharField(max_length=20, default='', editable=False)
+    email_lower = models.CharField(max_length=254, default='', editable=False)
 
     class Meta:
         ordering = ['-created_at']  # Add default ordering
+        indexes = [
+            # Serves keyset pagination of the client list
+            models.Index(fields=['-created_at', 'id'], name='client_created_id_idx'),
+            # Serve /api/clients/lookup/
+            models.Index(fields=['phone_digits'], name='client_phone_digits_idx'),
+            models.Index(fields=['email_lower'], name='client_email_lower_idx'),
+            # Serve the cohort filters on gender and age
+            models.Index(fields=['gender', 'date_of_birth'], name='client_gender_dob_idx'),
+            models.Index(fields=['date_of_birth'], name='client_dob_idx'),
+        ]
+
+    def normalize_contacts(self):
+        self.phone_digits = digits_only(self.contact_number)
+        self.email_lower = normalize_email(self.email)
+
+    def save(self, *args, **kwargs):
+        self.normalize_contacts()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'contact_number', 'email'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'phone_digits', 'email_lower'}
+        # Derived tables (search index, summary counters) are updated by
+        # post_save handlers; keep them in the same transaction as the row
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -45,11 +86,145 @@ class Enrollment(models.Model):
     enrollment_date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['client', 'program']
         ordering = ['-enrollment_date']  # Add default ordering
+        indexes = [
+            # Serves keyset pagination of the enrollment list
+            models.Index(fields=['-enrollment_date', 'id'], name='enrollment_date_id_idx'),
+            # Serve program rosters, with and without a status filter
+            models.Index(fields=['program', '-enrollment_date', 'id'], name='enrollment_program_date_idx'),
+            models.Index(
+                fields=['program', 'status', '-enrollment_date', 'id'], name='enrollment_prog_status_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.client} - {self.program}"
 
+
+class ClientSearchToken(models.Model):
+    """Normalized name/email token (or token suffix) used by client search."""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=50)
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'position', 'client'], name='client_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return self.token
+
+class ImportCheckpoint(models.Model):
+    """Rows of an import file already committed, so an interrupted import can resume."""
+    name = models.CharField(max_length=200, unique=True)
+    rows_done = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.rows_done} rows)"
+
+class SummaryCounter(models.Model):
+    """A named running total maintained on write, e.g. ``clients``."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+class ProgramStatusCount(models.Model):
+    """Running count of a program's enrollments in one status."""
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='status_counts')
+    status = models.CharField(max_length=10, choices=Enrollment.STATUS_CHOICES)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['program', 'status']
+
+    def __str__(self):
+        return f"{self.program_id}/{self.status}={self.count}"
+
+class EnrollmentRollup(models.Model):
+    """Enrollments of a program per enrollment date bucket and current status."""
+    INTERVAL_CHOICES = (
+        ('day', 'Day'),
+        ('month', 'Month'),
+    )
+
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='rollups')
+    interval = models.CharField(max_length=5, choices=INTERVAL_CHOICES)
+    period = models.DateField()
+    status = models.CharField(max_length=10, choices=Enrollment.STATUS_CHOICES)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['program', 'interval', 'period', 'status']
+
+    def __str__(self):
+        return f"{self.program_id}/{self.interval}/{self.period}/{self.status}={self.count}"
+
+class Change(models.Model):
+    """One create, update or delete in the change feed, in ``seq`` order."""
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Serves compaction: is there a later entry for the same object?
+            models.Index(fields=['model', 'object_id', 'seq'], name='change_object_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.action} {self.model} {self.object_id}"
+
+class ClientMatchKey(models.Model):
+    """Blocking key of a client; clients sharing one are compared for duplicates."""
+    KIND_CHOICES = [
+        ('name', 'Last name and birth year'),
+        ('sound', 'Phonetic name'),
+        ('phone', 'Phone number'),
+    ]
+
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='match_keys')
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    key = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'key', 'client'], name='client_match_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
+
+class ClientNameKey(models.Model):
+    """Normalized client name (in one word order) with the name to display, for autocomplete."""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='name_keys')
+    key = models.CharField(max_length=100)
+    display = models.CharField(max_length=201)
+
+    class Meta:
+        indexes = [
+            # Covers autocomplete: prefix scan in key order, no table lookups
+            models.Index(fields=['key', 'client', 'display'], name='client_name_key_idx'),
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,207 @@
+import base64
+import copy
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a fixed composite ordering.
+
+    Pages are fetched with a WHERE clause on the ordering values of the last
+    row seen instead of an OFFSET, and no COUNT(*) is issued, so page 5,000
+    costs the same as page 1. The queryset may also be ordered by one of
+    ``orderings``; requests that pass ``?page=`` or that reorder it any
+    other way (``?order_by=``) fall back to the regular page-number
+    pagination.
+    """
+    ordering = ('-pk',)
+    orderings = ()
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    fallback_class = PageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        if page is None:
+            return self.fallback.paginate_queryset(queryset, request, view)
+        return self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, reading rows with the async ORM."""
+        page = self.page_queryset(queryset, request)
+        if page is None:
+            return await self.apaginate_fallback(queryset, request)
+        return self.set_page([row async for row in page])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated queryset of the requested page, or ``None`` to fall back."""
+        self.request = request
+        self.fallback = None
+        if self.use_fallback(queryset, request):
+            self.fallback = self.fallback_class()
+            return None
+
+        self.keyset = tuple(queryset.query.order_by) or tuple(self.ordering)
+        self.fields = [self._get_field(queryset, name) for name in self.keyset]
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+
+        ordering = self._reversed_ordering() if self.reverse else self.keyset
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, self.cursor['values']))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    async def apaginate_fallback(self, queryset, request):
+        """The fallback's ``paginate_queryset`` with the count and page read asynchronously."""
+        fallback = self.fallback
+        page_size = fallback.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = fallback.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = fallback.get_page_number(request, paginator)
+        try:
+            fallback.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(fallback.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        fallback.page.object_list = [row async for row in fallback.page.object_list]
+        fallback.request = request
+        return list(fallback.page)
+
+    def use_fallback(self, queryset, request):
+        if self.page_query_param in request.query_params:
+            return True
+        order_by = tuple(queryset.query.order_by)
+        return bool(order_by) and order_by not in (tuple(self.ordering), *map(tuple, self.orderings))
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'A page number; switches to page-number pagination.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        payload = {
+            'v': [field.value_to_string(instance) for field in self.fields],
+            'r': reverse,
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(payload).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['v']
+            if len(values) != len(self.fields):
+                raise ValueError
+            return {
+                'values': [field.to_python(value) for field, value in zip(self.fields, values)],
+                'reverse': bool(payload.get('r')),
+            }
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_field(self, queryset, name):
+        name = name.lstrip('-')
+        if name in queryset.query.annotations:
+            # Read and filtered by name like a model field
+            field = copy.copy(queryset.query.annotations[name].output_field)
+            field.set_attributes_from_name(name)
+            return field
+        model = queryset.model
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else '-' + name for name in self.keyset)
+
+    def _seek_filter(self, ordering, values):
+        # (a, b) after (x, y) => a > x OR (a = x AND b > y), per-column direction.
+        seek = Q()
+        for index, name in enumerate(ordering):
+            column = self.fields[index].name
+            lookup = '__lt' if name.startswith('-') else '__gt'
+            condition = Q(**{column + lookup: values[index]})
+            for previous in range(index):
+                condition &= Q(**{self.fields[previous].name: values[previous]})
+            seek |= condition
+        return seek
+
+
+class ClientPagination(KeysetPagination):
+    ordering = ('-created_at', 'id')
+    # Ranked search results (search.search_clients)
+    orderings = [('-search_rank', 'id')]
+
+
+class EnrollmentPagination(KeysetPagination):
+    ordering = ('-enrollment_date', 'id')
@@ -0,0 +1,113 @@
+"""
+Read-model cache for assembled client profiles, enabled by
+``CLIENT_PROFILE_CACHE_TIMEOUT``; several workers need a shared cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max, Prefetch
+
+from .models import Client, Enrollment
+
+CACHE_KEY = 'client-profile:{}'
+
+
+def profile_queryset():
+    """Clients with enrollments and their programs fetched in one joined query."""
+    return Client.objects.prefetch_related(
+        Prefetch('enrollments', queryset=Enrollment.objects.select_related('program'))
+    )
+
+
+def profile_version(pk):
+    """
+    ``(validators, last_modified)`` of a client's profile from one grouped
+    query, or ``None`` when the client does not exist. The validators are
+    the client's ``updated_at``, its enrollment count and the latest change
+    to its enrollments and their programs; deleting an enrollment touches
+    the client's ``updated_at``.
+    """
+    rows = _version_rows(pk)
+    return None if rows is None else _version(rows.first())
+
+
+async def aprofile_version(pk):
+    rows = _version_rows(pk)
+    return None if rows is None else _version(await rows.afirst())
+
+
+def _version_rows(pk):
+    if not str(pk).isdigit():
+        return None
+    return (
+        Client.objects.filter(pk=int(pk))
+        .annotate(
+            enrollment_count=Count('enrollments'),
+            enrollments_updated=Max('enrollments__updated_at'),
+            programs_updated=Max('enrollments__program__updated_at'),
+        )
+        .values_list('updated_at', 'enrollment_count', 'enrollments_updated', 'programs_updated')
+    )
+
+
+def _version(row):
+    if row is None:
+        return None
+    updated_at, _, enrollments_updated, programs_updated = row
+    return row, max(value for value in (updated_at, enrollments_updated, programs_updated) if value)
+
+
+def _cache():
+    timeout = getattr(settings, 'CLIENT_PROFILE_CACHE_TIMEOUT', None)
+    if timeout is None:
+        return None, None
+    return caches[getattr(settings, 'CLIENT_PROFILE_CACHE_ALIAS', 'default')], timeout
+
+
+def get_cached_profile(pk):
+    cache, _ = _cache()
+    if cache is None or not str(pk).isdigit():
+        return None
+    return cache.get(CACHE_KEY.format(int(pk)))
+
+
+def cache_profile(pk, data):
+    cache, timeout = _cache()
+    if cache is not None and str(pk).isdigit():
+        cache.set(CACHE_KEY.format(int(pk)), dict(data), timeout)
+
+
+async def aget_cached_profile(pk):
+    cache, _ = _cache()
+    if cache is None or not str(pk).isdigit():
+        return None
+    return await cache.aget(CACHE_KEY.format(int(pk)))
+
+
+async def acache_profile(pk, data):
+    cache, timeout = _cache()
+    if cache is not None and str(pk).isdigit():
+        await cache.aset(CACHE_KEY.format(int(pk)), dict(data), timeout)
+
+
+def invalidate_client_profiles(client_ids):
+    cache, _ = _cache()
+    if cache is not None:
+        cache.delete_many([CACHE_KEY.format(pk) for pk in client_ids])
+
+
+def invalidate_program_profiles(program_id, batch_size=1000):
+    cache, _ = _cache()
+    if cache is None:
+        return
+    client_ids = Enrollment.objects.filter(program_id=program_id).values_list('client_id', flat=True)
+    batch = []
+    for client_id in client_ids.iterator(chunk_size=batch_size):
+        batch.append(client_id)
+        if len(batch) == batch_size:
+            invalidate_client_profiles(batch)
+            batch = []
+    invalidate_client_profiles(batch)
+
+
+def profile_cache_enabled():
+    return _cache()[0] is not None
@@ -0,0 +1,136 @@
+"""
+Read replicas for the clients API.
+
+While ``ReplicaMiddleware`` serves a safe request (GET, HEAD, OPTIONS),
+``ReplicaRouter`` sends reads of ``clients`` models to one of
+``DATABASE_REPLICAS``, picked once per request so a page is read from a
+single snapshot. Everything else -- write requests, reads inside a
+transaction, other apps (users), management commands -- uses ``default``.
+
+Replicas lag behind the primary, so a successful write request pins its
+user to the primary for ``READ_REPLICA_PIN_SECONDS`` and they read their
+own writes. Pins are kept in the ``READ_REPLICA_PIN_CACHE_ALIAS`` cache,
+which must be shared by all workers for the pin to follow the user.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'replica-pin:{}'
+
+_current = contextvars.ContextVar('replica_request', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def _cache():
+    return caches[getattr(settings, 'READ_REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def pin(user_id):
+    """Send ``user_id``'s reads to the primary for ``READ_REPLICA_PIN_SECONDS``."""
+    timeout = getattr(settings, 'READ_REPLICA_PIN_SECONDS', 5)
+    if timeout:
+        _cache().set(PIN_KEY.format(user_id), True, timeout)
+
+
+def is_pinned(user_id):
+    return bool(_cache().get(PIN_KEY.format(user_id)))
+
+
+def _user_id(request):
+    # Set by DRF once the request is authenticated
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class ReadState:
+    """The replica chosen for one safe request, resolved on its first read."""
+    __slots__ = ('request', 'alias')
+
+    def __init__(self, request):
+        self.request = request
+        self.alias = None
+
+    def replica(self):
+        if self.alias is None:
+            user_id = _user_id(self.request)
+            if user_id is None:
+                # Not authenticated (yet); decide on a later read
+                return None
+            self.alias = DEFAULT_DB_ALIAS if is_pinned(user_id) else random.choice(replicas())
+        return None if self.alias == DEFAULT_DB_ALIAS else self.alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or model._meta.app_label != 'clients':
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A replica holds the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """Routes safe requests to replicas and pins writers to the primary."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        token = _current.set(ReadState(request) if request.method in SAFE_METHODS else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            pin(user_id)
+        return response
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        token = _current.set(ReadState(request) if request.method in SAFE_METHODS else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            await sync_to_async(pin)(user_id)
+        return response
+
+    def writer(self, request, response):
+        """The user to pin after a successful write, if any."""
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return None
+        return _user_id(request)
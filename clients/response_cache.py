@@ -0,0 +1,218 @@
+"""
+Versioned cache of serialized responses for read-mostly viewsets.
+
+``ResponseCacheMixin`` stores the ``data`` of ``list`` and ``retrieve``
+responses under a key made of the request's scheme, host, path and query
+string and the validators ``ConditionalGetMixin`` has just read: the change
+stamps of the models a list shows, or the ``updated_at`` values of a single
+object. Every write moves those forward, so entries are never served stale
+and never need explicit invalidation; superseded keys simply age out of
+the LRU.
+
+The backend is chosen with ``RESPONSE_CACHE_BACKEND`` (a dotted path, or
+``None`` to disable) and ``RESPONSE_CACHE_OPTIONS``. Both bundled backends
+are bounded by ``max_entries`` and evict the least recently used entry.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+from health_system.metrics import register_collector
+
+
+class MemoryBackend:
+    """Per-process LRU dict."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            evicted = 0
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class FileBackend:
+    """
+    One pickle file per entry in ``directory``, shared by every process on
+    the host. Reads refresh the file's mtime. Each process counts the files
+    it adds, and once the count passes ``max_entries`` the directory is
+    scanned and the files with the oldest mtimes are evicted down to 90% of
+    it, so the scan runs once per tenth of the cache rather than per write.
+    Writes by other processes are only seen at the next scan, so the bound
+    is approximate.
+    """
+
+    suffix = '.response'
+
+    def __init__(self, directory, max_entries=1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.count = len(self.scan())
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as handle:
+                value = pickle.load(handle)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return value
+
+    def set(self, key, value):
+        path = self.path(key)
+        added = not os.path.exists(path)
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, 'wb') as output:
+            pickle.dump(value, output, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        with self.lock:
+            self.count += added
+            return self.evict() if self.count > self.max_entries else 0
+
+    def scan(self):
+        """``[(mtime, path)]`` of the entry files."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        return entries
+
+    def evict(self):
+        entries = self.scan()
+        keep = self.max_entries - self.max_entries // 10
+        evicted = 0
+        for _, path in sorted(entries)[:max(len(entries) - keep, 0)]:
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+        self.count = len(entries) - evicted
+        return evicted
+
+    def clear(self):
+        with self.lock:
+            for _, path in self.scan():
+                os.remove(path)
+            self.count = 0
+
+
+class ResponseCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.backend = None
+        self.configured = None
+        self.hits = self.misses = self.evictions = 0
+
+    def get_backend(self):
+        config = (
+            getattr(settings, 'RESPONSE_CACHE_BACKEND', None),
+            repr(getattr(settings, 'RESPONSE_CACHE_OPTIONS', {})),
+        )
+        # Rebuilt when the settings change (e.g. override_settings in tests)
+        if config != self.configured:
+            with self.lock:
+                path = config[0]
+                self.backend = import_string(path)(**settings.RESPONSE_CACHE_OPTIONS) if path else None
+                self.configured = config
+        return self.backend
+
+    def get(self, key):
+        value = self.get_backend().get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        evicted = self.get_backend().set(key, value)
+        with self.lock:
+            self.evictions += evicted
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def metrics(self):
+        lines = []
+        for name, value, help_text in (
+            ('hits', self.hits, 'Responses served from the response cache'),
+            ('misses', self.misses, 'Cacheable responses that had to be built'),
+            ('evictions', self.evictions, 'Entries evicted from the response cache'),
+        ):
+            lines.append(f'# HELP response_cache_{name}_total {help_text}')
+            lines.append(f'# TYPE response_cache_{name}_total counter')
+            lines.append(f'response_cache_{name}_total {value}')
+        return lines
+
+
+response_cache = ResponseCache()
+register_collector(response_cache.metrics)
+
+
+class ResponseCacheMixin:
+    """
+    Cache ``list``/``retrieve`` data; place after ``ConditionalGetMixin``,
+    whose validators (``self.validators``) version the key.
+    """
+
+    def cached(self, request, render):
+        validators = getattr(self, 'validators', None)
+        if validators is None or response_cache.get_backend() is None:
+            return render()
+        # Bodies hold absolute next/previous links, so the origin is part of the key
+        key = hashlib.sha256(repr((
+            type(self).__name__, self.action, request.scheme, request.get_host(),
+            request.get_full_path(), validators,
+        )).encode()).hexdigest()
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = render()
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(ResponseCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(ResponseCacheMixin, self).retrieve(request, *args, **kwargs))
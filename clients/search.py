@@ -0,0 +1,121 @@
+"""
+Token index backing client search.
+
+Every client name and email is normalized (accents stripped, lowercased,
+split on anything that is not a letter or digit) and each token is stored
+in ``ClientSearchToken``. Name words also store up to ``MAX_SUFFIXES`` of
+their suffixes of at least ``MIN_SUFFIX_LENGTH`` characters. A query word
+then becomes a prefix range scan on the token index, and matching a suffix
+is a substring match, so every lookup stays an index seek.
+"""
+import re
+import unicodedata
+
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+
+from .indexing import ClientIndex
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+MAX_TOKEN_LENGTH = 50
+MIN_SUFFIX_LENGTH = 3
+# Suffix rows per name word, longest first: each one is an index row to
+# write, so substring matches are limited to the start of long words
+MAX_SUFFIXES = 4
+MAX_QUERY_WORDS = 5
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(value):
+    if not value or value.isascii():
+        return (value or '').lower()
+    value = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower()
+
+
+def tokenize(value):
+    return [word[:MAX_TOKEN_LENGTH] for word in _WORD_RE.findall(normalize(value))]
+
+
+def client_tokens(first_name, last_name, email):
+    """Return the set of ``(token, position)`` pairs indexed for a client."""
+    tokens = {(word, 0) for word in tokenize(email)}
+    for value in (first_name, last_name):
+        for word in tokenize(value):
+            tokens.add((word, 0))
+            for position in range(1, min(len(word) - MIN_SUFFIX_LENGTH, MAX_SUFFIXES) + 1):
+                tokens.add((word[position:], position))
+    return tokens
+
+
+def token_rows(client):
+    return client_tokens(client.first_name, client.last_name, client.email)
+
+
+TOKEN_INDEX = ClientIndex('ClientSearchToken', ('token', 'position'), token_rows, SEARCH_FIELDS)
+
+
+def index_clients(clients, replace=True):
+    """(Re)build the search tokens of ``clients`` (see ``bulk`` for bulk inserts)."""
+    TOKEN_INDEX.update(clients, replace)
+
+
+def _word_match(word, prefix=''):
+    # Tokens only contain [a-z0-9], so padding with 'z' bounds every
+    # token starting with ``word`` under any collation.
+    upper = word + 'z' * (MAX_TOKEN_LENGTH - len(word))
+    match = Q(**{f'{prefix}token__range': (word, upper)})
+    if len(word) < MIN_SUFFIX_LENGTH:
+        match &= Q(**{f'{prefix}position': 0})
+    return match
+
+
+def search_clients(queryset, query, ranked=True):
+    """
+    Filter a ``Client`` queryset to rows matching every word of ``query``.
+
+    Without ``ranked``, matching clients are found with a grouped scan of
+    the token index alone. With ``ranked``, the clients are grouped with
+    their matching tokens in one query, annotated with ``search_rank`` and
+    ordered by ``('-search_rank', 'id')``: whole-word hits score above
+    word-prefix hits, which score above substring hits.
+    """
+    from .models import ClientSearchToken
+
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+    if not words:
+        return queryset
+
+    prefix = 'search_tokens__' if ranked else ''
+    any_word = Q()
+    hits = {}
+    rank = Value(0)
+    for index, word in enumerate(words):
+        match = _word_match(word, prefix)
+        any_word |= match
+        hits[f'hit{index}'] = Max(Case(When(match, then=1), default=0))
+        rank = rank + Case(
+            When(Q(**{f'{prefix}token': word, f'{prefix}position': 0}), then=3),
+            When(match & Q(**{f'{prefix}position': 0}), then=2),
+            When(match, then=1),
+            default=0,
+            output_field=IntegerField(),
+        )
+
+    if ranked:
+        # The aggregates read the token join of the filter: no per-row subquery
+        return (
+            queryset.filter(any_word)
+            .alias(**hits)
+            .annotate(search_rank=Sum(rank))
+            .filter(**{name: 1 for name in hits})
+            .order_by('-search_rank', 'id')
+        )
+    matches = (
+        ClientSearchToken.objects.filter(any_word).order_by()
+        .values('client_id')
+        .annotate(**hits)
+        .filter(**{name: 1 for name in hits})
+        .values('client_id')
+    )
+    return queryset.filter(pk__in=matches)
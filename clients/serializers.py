@@ -2,6 +2,15 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Client, Program, Enrollment
 from django.core.validators import RegexValidator, EmailValidator
+from .filters import CLIENT_FILTER_PARAMS
+from health_system.metrics import timed
+
+class TimedSerializerMixin:
+    """Reports representation time to the request metrics as ``serialize``."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -11,19 +20,32 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'password')
         extra_kwargs = {'password': {'write_only': True}}
 
-class ProgramSerializer(serializers.ModelSerializer):
+class ProgramSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Program
         fields = ['id', 'name', 'description', 'created_at']
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     program_name = serializers.CharField(source='program.name', read_only=True)
     
     class Meta:
         model = Enrollment
         fields = ['id', 'client', 'program', 'program_name', 'enrollment_date', 'status', 'notes']
 
-class ClientSerializer(serializers.ModelSerializer):
+    # Relations that ?expand= may embed in place of their id
+    expandable = {
+        'client': lambda: ClientSerializer,
+        'program': lambda: ProgramSerializer,
+    }
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in self.context.get('expand', ()):
+            serializer_class = self.expandable[name]()
+            data[name] = serializer_class(getattr(instance, name), context=self.context).data
+        return data
+
+class ClientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # Add validators
     contact_number = serializers.CharField(
         validators=[RegexValidator(r'^\d{10,15}$', 'Enter a valid phone number.')]
@@ -44,7 +66,7 @@ class ClientSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Date of birth cannot be in the future")
         return value
 
-class ClientProfileSerializer(serializers.ModelSerializer):
+class ClientProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     enrollments = serializers.SerializerMethodField()
     
     class Meta:
@@ -53,7 +75,8 @@ class ClientProfileSerializer(serializers.ModelSerializer):
                   'contact_number', 'email', 'address', 'created_at', 'enrollments']
     
     def get_enrollments(self, obj):
-        enrollments = Enrollment.objects.filter(client=obj)
+        # Relies on profile_queryset() prefetching enrollments with their programs
+        enrollments = obj.enrollments.all()
         return [{
             'id': enrollment.id,
             'program_id': enrollment.program.id,
@@ -64,3 +87,39 @@ class ClientProfileSerializer(serializers.ModelSerializer):
             'notes': enrollment.notes
         } for enrollment in enrollments]
 
+
+class ProgramRosterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A program member: the client's details followed by their enrollment."""
+    client = ClientSerializer(read_only=True)
+    enrollment_id = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = ['client', 'enrollment_id', 'enrollment_date', 'status', 'notes']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        member = data.pop('client')
+        member.update(data)
+        return member
+
+class ProgramEnrollSerializer(serializers.Serializer):
+    """Input of the program mass-enrollment action."""
+    client_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    filter = serializers.DictField(child=serializers.CharField(), required=False)
+    enrollment_date = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Enrollment.STATUS_CHOICES, default='active')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_filter(self, value):
+        unknown = set(value) - set(CLIENT_FILTER_PARAMS)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        return value
+
+    def validate(self, attrs):
+        if ('client_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'client_ids' or 'filter'.")
+        import datetime
+        attrs.setdefault('enrollment_date', datetime.date.today())
+        return attrs
@@ -0,0 +1,147 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import user_cache
+from .autocomplete import NAME_FIELDS, index_client_names
+from .changes import log_changes
+from .duplicates import MATCH_FIELDS, index_match_keys
+from .models import Client, Enrollment, Program
+from .profiles import invalidate_client_profiles, invalidate_program_profiles
+from .rollups import adjust_rollups
+from .search import SEARCH_FIELDS, index_clients
+from .summary import CLIENTS, adjust_counter, adjust_program_counts
+from .versions import touch
+
+
+@receiver(post_save, sender=Client)
+def update_client_search_index(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    index_clients([instance], replace=not created)
+
+
+@receiver(post_save, sender=Client)
+def update_client_name_keys(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(NAME_FIELDS):
+        return
+    index_client_names([instance], replace=not created)
+
+
+@receiver(post_save, sender=Client)
+def update_client_match_keys(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(MATCH_FIELDS):
+        return
+    index_match_keys([instance], replace=not created)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def invalidate_client_profile(sender, instance, **kwargs):
+    invalidate_client_profiles([instance.pk])
+
+
+@receiver(post_save, sender=Client)
+def count_saved_client(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(CLIENTS, 1)
+
+
+@receiver(post_delete, sender=Client)
+def count_deleted_client(sender, instance, **kwargs):
+    adjust_counter(CLIENTS, -1)
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrollment_state(sender, instance, **kwargs):
+    # A changed program, status or date moves the enrollment between summary
+    # counts and rollup buckets, and a move to another client changes both
+    # profiles
+    instance._previous = None
+    if instance.pk:
+        instance._previous = (
+            Enrollment.objects.filter(pk=instance.pk)
+            .values('client_id', 'program_id', 'status', 'enrollment_date').first()
+        )
+
+
+@receiver(post_save, sender=Enrollment)
+def count_saved_enrollment(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    counts, rollups = Counter(), Counter()
+    counts[(instance.program_id, instance.status)] += 1
+    rollups[(instance.program_id, instance.enrollment_date, instance.status)] += 1
+    if previous is not None:
+        counts[(previous['program_id'], previous['status'])] -= 1
+        rollups[(previous['program_id'], previous['enrollment_date'], previous['status'])] -= 1
+    adjust_program_counts(counts)
+    adjust_rollups(rollups)
+
+
+@receiver(post_delete, sender=Enrollment)
+def count_deleted_enrollment(sender, instance, **kwargs):
+    adjust_program_counts({(instance.program_id, instance.status): -1})
+    adjust_rollups({(instance.program_id, instance.enrollment_date, instance.status): -1})
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_enrollment_profile(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    client_ids = {instance.client_id, previous['client_id'] if previous else None}
+    invalidate_client_profiles([pk for pk in client_ids if pk is not None])
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def touch_enrollment_client(sender, instance, signal, **kwargs):
+    # A profile that lost an enrollment must still look modified
+    previous = getattr(instance, '_previous', None)
+    if signal is post_delete:
+        lost = instance.client_id
+    elif previous and previous['client_id'] != instance.client_id:
+        lost = previous['client_id']
+    else:
+        return
+    Client.objects.filter(pk=lost).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def touch_model(sender, **kwargs):
+    touch(sender)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Enrollment)
+def log_saved_change(sender, instance, created, **kwargs):
+    log_changes(sender, [instance.pk], 'create' if created else 'update')
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Enrollment)
+def log_deleted_change(sender, instance, **kwargs):
+    log_changes(sender, [instance.pk], 'delete')
+
+
+@receiver(post_save, sender=Program)
+@receiver(pre_delete, sender=Program)
+def invalidate_program_profile(sender, instance, **kwargs):
+    invalidate_program_profiles(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    # Covers deactivation and password changes in this process
+    user_cache.discard(getattr(instance, jwt_settings.USER_ID_FIELD))
@@ -0,0 +1,137 @@
+"""
+Incrementally maintained dashboard counters.
+
+``SummaryCounter('clients')`` and one ``ProgramStatusCount`` row per program
+and status are adjusted by the signal handlers (and by the bulk insert
+helpers) inside the transaction of the write they describe, so the
+dashboard reads a handful of rows instead of counting the tables.
+``rebuild_counters`` recomputes everything from scratch.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Client, Enrollment, Program, ProgramStatusCount, SummaryCounter
+
+CLIENTS = 'clients'
+RECENT_CLIENTS = 5
+
+
+def upsert(manager, lookup, values, initial):
+    """
+    Update the row matching ``lookup`` with ``values`` (expressions such as
+    ``F(field) + 1``), or create it with ``initial`` when there is none.
+    """
+    if manager.filter(**lookup).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            manager.create(**lookup, **initial)
+    except IntegrityError:
+        # Created concurrently; fall back to updating it
+        manager.filter(**lookup).update(**values)
+
+
+def increment(manager, lookup, field, delta):
+    """
+    Add ``delta`` to ``field`` of the row matching ``lookup``, creating it on
+    increments. Decrements never create rows: a missing row means its parent
+    (e.g. the program) is being deleted.
+    """
+    if delta > 0:
+        upsert(manager, lookup, {field: F(field) + delta}, {field: delta})
+    elif delta < 0:
+        manager.filter(**lookup).update(**{field: F(field) + delta})
+
+
+def increment_many(manager, key_fields, field, deltas):
+    """
+    Apply ``{key: delta}`` where each key is a tuple of ``key_fields`` values:
+    one query finds the existing rows, one ``bulk_update`` adds the deltas
+    to them and one ``bulk_create`` inserts the missing ones.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    lookup = {
+        f'{name}__in': {key[position] for key in deltas}
+        for position, name in enumerate(key_fields)
+    }
+    rows = []
+    for row in manager.filter(**lookup).only('pk', *key_fields):
+        delta = deltas.pop(tuple(getattr(row, name) for name in key_fields), None)
+        if delta:
+            setattr(row, field, F(field) + delta)
+            rows.append(row)
+    manager.bulk_update(rows, [field])
+
+    missing = {key: delta for key, delta in deltas.items() if delta > 0}
+    try:
+        with transaction.atomic():
+            manager.bulk_create([
+                manager.model(**dict(zip(key_fields, key)), **{field: delta})
+                for key, delta in missing.items()
+            ])
+    except IntegrityError:
+        # Some were created concurrently; fall back to one row at a time
+        for key, delta in missing.items():
+            increment(manager, dict(zip(key_fields, key)), field, delta)
+
+
+def adjust_counter(name, delta):
+    increment(SummaryCounter.objects, {'name': name}, 'value', delta)
+
+
+def adjust_program_counts(deltas):
+    """Apply ``{(program_id, status): delta}``."""
+    increment_many(ProgramStatusCount.objects, ('program_id', 'status'), 'count', deltas)
+
+
+def count_enrollments(enrollments, sign=1):
+    return Counter({
+        key: sign * count
+        for key, count in Counter((e.program_id, e.status) for e in enrollments).items()
+    })
+
+
+@transaction.atomic
+def rebuild_counters():
+    SummaryCounter.objects.filter(name=CLIENTS).delete()
+    SummaryCounter.objects.create(name=CLIENTS, value=Client.objects.count())
+    ProgramStatusCount.objects.all().delete()
+    ProgramStatusCount.objects.bulk_create([
+        ProgramStatusCount(program_id=row['program_id'], status=row['status'], count=row['count'])
+        for row in Enrollment.objects.order_by().values('program_id', 'status').annotate(count=Count('id'))
+    ])
+
+
+def dashboard_summary():
+    """Totals, per-program counts by status and the latest registrations."""
+    from .serializers import ClientSerializer
+
+    total_clients = SummaryCounter.objects.filter(name=CLIENTS).values_list('value', flat=True).first() or 0
+    statuses = [value for value, _ in Enrollment.STATUS_CHOICES]
+    programs = {}
+    rows = Program.objects.order_by('name', 'id').values(
+        'id', 'name', 'status_counts__status', 'status_counts__count'
+    )
+    for row in rows:
+        program = programs.setdefault(row['id'], {
+            'id': row['id'],
+            'name': row['name'],
+            'counts': dict.fromkeys(statuses, 0),
+            'total': 0,
+        })
+        if row['status_counts__status']:
+            program['counts'][row['status_counts__status']] = row['status_counts__count']
+            program['total'] += row['status_counts__count']
+
+    recent = Client.objects.order_by('-created_at', 'id')[:RECENT_CLIENTS]
+    return {
+        'total_clients': total_clients,
+        'total_programs': len(programs),
+        'total_enrollments': sum(program['total'] for program in programs.values()),
+        'programs': list(programs.values()),
+        'recent_clients': ClientSerializer(recent, many=True).data,
+    }
@@ -1,12 +1,40 @@
-from django.test import TestCase
-from rest_framework.test import APIClient
-from rest_framework import status
-from django.urls import reverse
-from .models import Client, Program, Enrollment
+import csv
+import datetime
+import gzip
 import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from health_system.metrics import registry
+from health_system.schema import schema_cache
+
+from . import duplicates
+from .async_views import AsyncReadView
+from .authentication import user_cache
+from .changes import prune
+from .datagen import DEFAULT_END_DATE, generate
+from .filters import _years_before, filter_clients
+from .models import Client, ClientMatchKey, ClientNameKey, Enrollment, Program
+from .pagination import ClientPagination
+from .response_cache import FileBackend, MemoryBackend, response_cache
+from .search import client_tokens
+from .versions import touch
+
 class BaseAPITestCase(TestCase):
     def setUp(self):
         # Create a test user
@@ -144,3 +172,1143 @@ class EnrollmentAPITest(BaseAPITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
 
+
+class KeysetPaginationTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(24):
+            Client.objects.create(**dict(self.client_data, first_name=f'Client{i}'))
+
+    def test_cursor_pages_cover_all_clients(self):
+        url = reverse('client-list')
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get(reverse('client-list')).data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+    def test_page_number_mode_still_available(self):
+        response = self.client.get(f"{reverse('client-list')}?page=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{reverse('client-list')}?cursor=bogus")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ClientSearchTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Client.objects.create(**dict(self.client_data, first_name='Jane', last_name='Smith', email='jane@example.com'))
+        Client.objects.create(**dict(self.client_data, first_name='José', last_name='Smithson', email='jose@clinic.org'))
+
+    def search(self, query):
+        response = self.client.get(reverse('client-list'), {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['first_name'] for row in response.data['results']]
+
+    def test_prefix_and_substring_match(self):
+        self.assertCountEqual(self.search('smi'), ['Jane', 'José'])
+        self.assertEqual(self.search('mithson'), ['José'])
+
+    def test_whole_word_matches_rank_first(self):
+        self.assertEqual(self.search('smith'), ['Jane', 'José'])
+
+    @mock.patch.object(ClientPagination, 'page_size', 2)
+    def test_ranked_results_are_keyset_paginated(self):
+        for first_name in ('Amani', 'Baraka', 'Chege'):
+            Client.objects.create(**dict(self.client_data, first_name=first_name, last_name='Smithers'))
+        with self.assertNumQueries(3):  # user, stamp, page (no COUNT)
+            response = self.client.get(reverse('client-list'), {'search': 'smith'})
+        self.assertNotIn('count', response.data)
+        names = [row['first_name'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            names += [row['first_name'] for row in response.data['results']]
+        self.assertEqual(names, ['Jane', 'José', 'Amani', 'Baraka', 'Chege'])
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([row['first_name'] for row in previous.data['results']], ['Amani', 'Baraka'])
+
+    def test_suffixes_are_capped(self):
+        tokens = client_tokens('Wanjiku', 'Mwangikariuki', 'wanjiku.mwangikariuki@example.com')
+        self.assertEqual(sorted(token for token, position in tokens if position), [
+            'angikariuki', 'anjiku', 'gikariuki', 'iku', 'jiku', 'ngikariuki', 'njiku', 'wangikariuki',
+        ])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('jane smith'), ['Jane'])
+        self.assertEqual(self.search('john smith'), [])
+
+    def test_accents_and_email_are_normalized(self):
+        self.assertEqual(self.search('jose'), ['José'])
+        self.assertEqual(self.search('clinic.org'), ['José'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.test_client.last_name = 'Kamau'
+        self.test_client.save()
+        self.assertEqual(self.search('kamau'), ['John'])
+        self.assertEqual(self.search('doe'), [])
+        self.test_client.delete()
+        self.assertEqual(self.search('kamau'), [])
+
+
+class ClientProfileTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            program = Program.objects.create(name=f'Program {i}', description='Description')
+            Enrollment.objects.create(client=self.test_client, program=program, enrollment_date='2023-01-01')
+        self.url = reverse('client-profile', args=[self.test_client.id])
+
+    def test_profile_query_count_is_constant(self):
+        # user lookup, validators, client, enrollments joined with programs
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['enrollments']), 5)
+        self.assertIn('Program 0', [e['program_name'] for e in response.data['enrollments']])
+
+    @override_settings(CLIENT_PROFILE_CACHE_TIMEOUT=60)
+    def test_cached_profile_is_invalidated(self):
+        cache.clear()
+        first = self.client.get(self.url).data
+        with self.assertNumQueries(1):  # validators; the user is cached
+            self.assertEqual(self.client.get(self.url).data, first)
+
+        program = Program.objects.get(name='Program 0')
+        program.name = 'Renamed Program'
+        program.save()
+        names = [e['program_name'] for e in self.client.get(self.url).data['enrollments']]
+        self.assertIn('Renamed Program', names)
+
+        Enrollment.objects.filter(program=program).get().delete()
+        self.assertEqual(len(self.client.get(self.url).data['enrollments']), 4)
+
+        self.test_client.first_name = 'Johnny'
+        self.test_client.save()
+        self.assertEqual(self.client.get(self.url).data['first_name'], 'Johnny')
+
+
+class ClientBulkCreateTest(BaseAPITestCase):
+    def test_bulk_create_reports_row_errors(self):
+        rows = [
+            dict(self.client_data, first_name='Amina', email='amina@example.com'),
+            dict(self.client_data, contact_number='not-a-phone'),
+            dict(self.client_data, first_name='Baraka', email='baraka@example.com'),
+        ]
+        response = self.client.post(
+            reverse('client-bulk'), data=json.dumps(rows), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertIn('contact_number', response.data['errors'][0]['errors'])
+        self.assertEqual(Client.objects.count(), 3)
+        created = Client.objects.filter(pk__in=response.data['ids']).order_by('pk')
+        self.assertEqual([(c.first_name, c.date_of_birth, c.email_lower) for c in created], [
+            ('Amina', datetime.date(1990, 1, 1), 'amina@example.com'),
+            ('Baraka', datetime.date(1990, 1, 1), 'baraka@example.com'),
+        ])
+
+        search = self.client.get(reverse('client-list'), {'search': 'baraka'})
+        self.assertEqual(len(search.data['results']), 1)
+
+    def test_bulk_create_accepts_ndjson(self):
+        body = '\n'.join(json.dumps(dict(self.client_data, first_name=f'Row{i}')) for i in range(3))
+        response = self.client.post(
+            reverse('client-bulk'), data=body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(
+            reverse('client-bulk'), data=json.dumps(self.client_data), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProgramEnrollTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.others = [
+            Client.objects.create(**dict(self.client_data, first_name=f'Member{i}', last_name='Otieno'))
+            for i in range(3)
+        ]
+        self.url = reverse('program-enroll', args=[self.program.id])
+
+    def test_enroll_client_ids_skips_existing(self):
+        Enrollment.objects.create(client=self.others[0], program=self.program, enrollment_date='2023-01-01')
+        ids = [c.id for c in self.others] + [self.test_client.id, 999999]
+        response = self.client.post(self.url, data=json.dumps({'client_ids': ids}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['skipped'], 1)
+        self.assertEqual(response.data['not_found'], [999999])
+        self.assertEqual(Enrollment.objects.filter(program=self.program).count(), 4)
+
+    def test_enroll_by_filter(self):
+        response = self.client.post(
+            self.url,
+            data=json.dumps({'filter': {'search': 'otieno'}, 'status': 'active'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.data['created'], 3)
+        self.assertFalse(Enrollment.objects.filter(client=self.test_client).exists())
+
+    def test_enroll_requires_ids_or_filter(self):
+        response = self.client.post(self.url, data=json.dumps({}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ExportTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Client.objects.create(**dict(self.client_data, first_name='Jane', last_name='Smith'))
+        Enrollment.objects.create(client=self.test_client, program=self.program, enrollment_date='2023-01-01')
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_honors_search(self):
+        body = self.read(self.client.get(reverse('client-export'), {'format': 'csv', 'search': 'smith'}))
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'first_name', 'last_name'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Jane', lines[1])
+
+    def test_csv_export_neutralizes_formulas(self):
+        Client.objects.create(**dict(self.client_data, first_name='=HYPERLINK("x")', last_name='@SUM(A1)',
+                                     address='-2+3'))
+        body = self.read(self.client.get(reverse('client-export'), {'format': 'csv', 'search': 'hyperlink'}))
+        row = next(csv.DictReader(body.decode().splitlines()))
+        self.assertEqual(row['first_name'], '\'=HYPERLINK("x")')
+        self.assertEqual(row['last_name'], "'@SUM(A1)")
+        self.assertEqual(row['address'], "'-2+3")
+        ndjson = self.read(self.client.get(reverse('client-export'), {'format': 'ndjson', 'search': 'hyperlink'}))
+        self.assertEqual(json.loads(ndjson)['first_name'], '=HYPERLINK("x")')
+
+    def test_ndjson_export_of_enrollments(self):
+        body = self.read(self.client.get(reverse('enrollment-export'), {'format': 'ndjson'}))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(rows[0]['program_name'], 'Test Program')
+        self.assertEqual(rows[0]['client'], self.test_client.id)
+
+    def test_gzip_export(self):
+        response = self.client.get(reverse('program-export'), {'format': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Test Program', gzip.decompress(self.read(response)))
+
+class ImportClientsCommandTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as handle:
+            handle.write(content)
+        return path
+
+    def test_import_and_resume(self):
+        programs = self.write('programs.csv', 'id,name,description\np1,TB Control,TB\np2,Malaria,Nets\n')
+        clients = self.write('clients.ndjson', '\n'.join(json.dumps({
+            'id': f'c{i}', 'first_name': f'Name{i}', 'last_name': 'Mwangi', 'date_of_birth': '1990-01-01',
+            'gender': 'F', 'contact_number': '0712345678', 'email': f'n{i}@example.com', 'address': 'Nairobi'
+        }) for i in range(5)) + '\n{"first_name": "Broken"}\n')
+        enrollments = self.write('enrollments.csv', (
+            'client,program,enrollment_date,status\n'
+            'c0,p1,2024-01-01,active\nc1,Malaria,2024-02-01,completed\nc9,p1,2024-01-01,active\n'
+        ))
+        options = dict(
+            programs=programs, clients=clients, enrollments=enrollments, batch_size=2,
+            checkpoint='register', client_map=self.write('map.csv', ''), stdout=StringIO()
+        )
+
+        call_command('import_clients', **options)
+        self.assertEqual(Program.objects.count(), 2)
+        self.assertEqual(Client.objects.count(), 5)
+        self.assertEqual(Enrollment.objects.count(), 2)
+        self.assertEqual(Enrollment.objects.get(program__name='Malaria').client.first_name, 'Name1')
+        self.assertTrue(Client.objects.filter(search_tokens__token='mwangi').exists())
+
+        call_command('import_clients', **options)
+        self.assertEqual(Program.objects.count(), 2)
+        self.assertEqual(Client.objects.count(), 5)
+        self.assertEqual(Enrollment.objects.count(), 2)
+
+    def test_unmapped_client_id_is_not_a_database_id(self):
+        client = Client.objects.create(
+            first_name='Existing', last_name='Client', date_of_birth='1990-01-01', gender='F',
+            contact_number='0712345678', email='existing@example.com', address='Nairobi'
+        )
+        Program.objects.create(name='TB Control', description='TB')
+        enrollments = self.write('enrollments.csv', (
+            'client,program,enrollment_date\n'
+            f'{client.pk},TB Control,2024-01-01\n'
+            f'db:{client.pk},TB Control,2024-02-01\n'
+        ))
+        errors = os.path.join(self.tmp.name, 'errors.ndjson')
+
+        call_command(
+            'import_clients', enrollments=enrollments, client_map=self.write('map.csv', ''),
+            errors=errors, stdout=StringIO()
+        )
+        self.assertEqual(
+            list(Enrollment.objects.values_list('client_id', 'enrollment_date')),
+            [(client.pk, datetime.date(2024, 2, 1))]
+        )
+        with open(errors) as handle:
+            rejected = [json.loads(line) for line in handle]
+        self.assertEqual([row['row'] for row in rejected], [0])
+        self.assertIn('db:<id>', rejected[0]['errors']['client'][0])
+
+class GenerateDatasetCommandTest(TestCase):
+    def generate(self):
+        call_command(
+            'generate_dataset', clients=120, programs=4, seed=7, shard_size=50, batch_size=20,
+            end_date=datetime.date(2024, 12, 31), stdout=StringIO()
+        )
+        return list(Client.objects.order_by('pk').values_list('first_name', 'last_name', 'date_of_birth'))
+
+    def test_generation_is_deterministic(self):
+        first = self.generate()
+        self.assertEqual(len(first), 120)
+        self.assertEqual(Program.objects.count(), 4)
+        self.assertTrue(Enrollment.objects.exists())
+        # Popularity is skewed towards the first program
+        counts = [Enrollment.objects.filter(program=p).count() for p in Program.objects.order_by('pk')]
+        self.assertEqual(counts[0], max(counts))
+
+        Client.objects.all().delete()
+        Program.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+    def test_default_dates_do_not_follow_the_calendar(self):
+        generate(50, 2, seed=7, shard_size=50)
+        dates = list(Enrollment.objects.values_list('enrollment_date', flat=True))
+        self.assertTrue(dates)
+        self.assertLessEqual(max(dates), DEFAULT_END_DATE)
+        self.assertGreaterEqual(min(dates), DEFAULT_END_DATE - datetime.timedelta(days=5 * 365))
+
+class RequestMetricsTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('client-list'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('queries"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint_groups_by_view(self):
+        self.client.get(reverse('client-list'))
+        self.client.get(reverse('client-profile', args=[self.test_client.id]))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="client-list"} 1', body)
+        self.assertIn('http_request_db_queries_total{view="client-profile"} 3', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="client-list",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = APIClient().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN=None)
+    def test_metrics_are_private_without_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('client-list')))
+
+class EnrollmentExpandTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            client = Client.objects.create(**dict(self.client_data, first_name=f'Client{i}'))
+            program = Program.objects.create(name=f'Program {i}', description='Description')
+            Enrollment.objects.create(client=client, program=program, enrollment_date='2023-01-01')
+
+    def test_list_joins_program(self):
+        with self.assertNumQueries(3):  # user, change stamps, page
+            response = self.client.get(reverse('enrollment-list'))
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertTrue(response.data['results'][0]['program_name'].startswith('Program'))
+
+    def test_expand_embeds_relations_in_one_query(self):
+        with self.assertNumQueries(3):  # user, change stamps, page
+            response = self.client.get(reverse('enrollment-list'), {'expand': 'client,program'})
+        row = response.data['results'][0]
+        self.assertTrue(row['client']['first_name'].startswith('Client'))
+        self.assertEqual(row['program']['name'], row['program_name'])
+
+    def test_unexpanded_relations_stay_ids(self):
+        response = self.client.get(reverse('enrollment-list'), {'expand': 'program'})
+        row = response.data['results'][0]
+        self.assertIsInstance(row['client'], int)
+        self.assertIsInstance(row['program'], dict)
+
+class ProgramRosterTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            client = Client.objects.create(**dict(self.client_data, first_name=f'Member{i:02d}'))
+            Enrollment.objects.create(
+                client=client, program=self.program, enrollment_date=f'2023-01-{i + 1:02d}',
+                status='completed' if i % 3 == 0 else 'active'
+            )
+        self.url = reverse('program-clients', args=[self.program.id])
+
+    def test_roster_is_one_joined_query_per_page(self):
+        with self.assertNumQueries(3):  # user, program, roster page
+            response = self.client.get(self.url)
+        rows = response.data['results']
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['first_name'], 'Member11')
+        self.assertEqual(rows[0]['enrollment_date'], '2023-01-12')
+        self.assertIn('status', rows[0])
+        rest = self.client.get(response.data['next']).data['results']
+        self.assertEqual(len(rest), 2)
+
+    def test_roster_status_filter_and_ordering(self):
+        response = self.client.get(self.url, {'status': 'completed', 'order_by': 'first_name'})
+        names = [row['first_name'] for row in response.data['results']]
+        self.assertEqual(names, ['Member00', 'Member03', 'Member06', 'Member09'])
+
+    def test_roster_rejects_unknown_status(self):
+        response = self.client.get(self.url, {'status': 'pending'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class DashboardSummaryTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_program = Program.objects.create(name='Another Program', description='')
+        self.enrollment = Enrollment.objects.create(
+            client=self.test_client, program=self.program, enrollment_date='2023-01-01'
+        )
+        self.url = reverse('dashboard-summary')
+
+    def counts(self, program):
+        summary = self.client.get(self.url).data
+        return next(row for row in summary['programs'] if row['id'] == program.id)['counts']
+
+    def test_summary_counts_follow_writes(self):
+        other = Client.objects.create(**dict(self.client_data, first_name='Jane'))
+        Enrollment.objects.create(client=other, program=self.other_program, enrollment_date='2023-02-01')
+        self.enrollment.status = 'completed'
+        self.enrollment.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_clients'], 2)
+        self.assertEqual(response.data['total_programs'], 2)
+        self.assertEqual(response.data['total_enrollments'], 2)
+        self.assertEqual(self.counts(self.program), {'active': 0, 'completed': 1, 'terminated': 0})
+        self.assertEqual(response.data['recent_clients'][0]['first_name'], 'Jane')
+
+        other.delete()
+        self.assertEqual(self.client.get(self.url).data['total_clients'], 1)
+        self.assertEqual(self.counts(self.other_program)['active'], 0)
+
+    def test_bulk_enroll_updates_counts(self):
+        clients = [Client.objects.create(**dict(self.client_data, first_name=f'Bulk{i}')) for i in range(3)]
+        ids = [c.id for c in clients] + [self.test_client.id]
+        self.client.post(
+            reverse('program-enroll', args=[self.program.id]),
+            data=json.dumps({'client_ids': ids}), content_type='application/json'
+        )
+        self.assertEqual(self.counts(self.program)['active'], 4)
+
+    def test_rebuild_matches_maintained_counts(self):
+        before = self.client.get(self.url).data
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data, before)
+
+    def test_summary_query_count_is_constant(self):
+        for i in range(20):
+            client = Client.objects.create(**dict(self.client_data, first_name=f'Load{i}'))
+            Enrollment.objects.create(client=client, program=self.other_program, enrollment_date='2023-03-01')
+        with self.assertNumQueries(4):  # user, clients counter, program counts, recent clients
+            self.client.get(self.url)
+
+class ProgramStatsTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.enrollments = []
+        for i, (date, enrollment_status) in enumerate([
+            ('2023-01-05', 'active'), ('2023-01-20', 'completed'),
+            ('2023-03-02', 'active'), ('2024-01-15', 'terminated'),
+        ]):
+            client = Client.objects.create(**dict(self.client_data, first_name=f'Stat{i}'))
+            self.enrollments.append(Enrollment.objects.create(
+                client=client, program=self.program, enrollment_date=date, status=enrollment_status
+            ))
+        self.url = reverse('program-stats', args=[self.program.id])
+
+    def test_monthly_stats_follow_writes(self):
+        self.enrollments[0].status = 'completed'
+        self.enrollments[0].save()
+        self.enrollments[2].delete()
+
+        with self.assertNumQueries(3):  # user, program, rollup rows
+            response = self.client.get(self.url, {'interval': 'month'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([row['period'] for row in results], [datetime.date(2023, 1, 1), datetime.date(2024, 1, 1)])
+        self.assertEqual(results[0]['completed'], 2)
+        self.assertEqual(results[0]['active'], 0)
+        self.assertEqual(results[1]['terminated'], 1)
+
+    def test_daily_stats_with_range_and_status(self):
+        response = self.client.get(self.url, {
+            'interval': 'day', 'start': '2023-01-10', 'end': '2023-12-31', 'status': 'active'
+        })
+        results = response.data['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['period'], datetime.date(2023, 3, 2))
+
+    def test_bulk_enroll_and_rebuild_match(self):
+        self.client.post(
+            reverse('program-enroll', args=[self.program.id]),
+            data=json.dumps({'client_ids': [self.test_client.id], 'enrollment_date': '2023-01-09'}),
+            content_type='application/json'
+        )
+        before = self.client.get(self.url).data
+        self.assertEqual(before['results'][0]['active'], 2)
+        call_command('rebuild_enrollment_rollups', stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).data, before)
+
+    def test_rejects_unknown_interval(self):
+        response = self.client.get(self.url, {'interval': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ConditionalGetTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Enrollment.objects.create(client=self.test_client, program=self.program, enrollment_date='2023-01-01')
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_is_not_modified(self):
+        url = reverse('program-list')
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):  # change stamps; the user is cached
+            again = self.revalidate(url, response)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Program.objects.create(name='New Program', description='')
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_on_delete(self):
+        url = reverse('enrollment-list')
+        response = self.client.get(url)
+        Enrollment.objects.get().delete()
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_detail_if_modified_since(self):
+        url = reverse('client-detail', args=[self.test_client.id])
+        response = self.client.get(url)
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.test_client.address = '456 Side St'
+        self.test_client.save()
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_profile_revalidates_after_enrollment_changes(self):
+        url = reverse('client-profile', args=[self.test_client.id])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.program.name = 'Renamed Program'
+        self.program.save()
+        renamed = self.revalidate(url, response)
+        self.assertEqual(renamed.status_code, status.HTTP_200_OK)
+
+        Enrollment.objects.get().delete()
+        self.assertEqual(self.revalidate(url, renamed).status_code, status.HTTP_200_OK)
+
+class ResponseCacheTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = response_cache
+        self.cache.get_backend().clear()
+        self.cache.reset_stats()
+
+    def test_program_list_is_served_from_cache(self):
+        url = reverse('program-list')
+        first = self.client.get(url).data
+        with self.assertNumQueries(1):  # change stamps; the user is cached
+            self.assertEqual(self.client.get(url).data, first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.program.name = 'Renamed Program'
+        self.program.save()
+        self.assertEqual(self.client.get(url).data['results'][0]['name'], 'Renamed Program')
+        self.assertEqual(self.client.get(url, {'order_by': 'name'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        self.assertEqual(backend.set('c', 3), 1)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            options = {'directory': directory, 'max_entries': 1}
+            with override_settings(RESPONSE_CACHE_BACKEND='clients.response_cache.FileBackend',
+                                   RESPONSE_CACHE_OPTIONS=options):
+                url = reverse('program-detail', args=[self.program.id])
+                first = self.client.get(url).data
+                self.assertEqual(self.client.get(url).data, first)
+                self.assertEqual(self.cache.hits, 1)
+                self.client.get(reverse('program-list'))
+                self.assertEqual(len(os.listdir(directory)), 1)
+                self.assertEqual(self.cache.evictions, 1)
+
+    def test_file_backend_evicts_in_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = FileBackend(directory, max_entries=20)
+            evicted = [backend.set(str(index), index) for index in range(23)]
+            # The 21st entry trims the directory to 18; the next two fit
+            self.assertEqual(evicted, [0] * 20 + [3, 0, 0])
+            self.assertEqual(len(os.listdir(directory)), 20)
+            # Overwriting an entry adds no file
+            self.assertEqual(backend.set('22', 22), 0)
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_key_includes_host_and_scheme(self):
+        url = reverse('program-list')
+        self.client.get(url, HTTP_HOST='a.example.com')
+        self.client.get(url, HTTP_HOST='b.example.com')
+        self.client.get(url, HTTP_HOST='a.example.com', secure=True)
+        self.client.get(url, HTTP_HOST='a.example.com')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    @override_settings(DEBUG=True)
+    def test_counters_are_exported(self):
+        self.client.get(reverse('program-list'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('response_cache_misses_total 1', body)
+
+class CachedAuthenticationTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('program-list')
+        self.client.get(self.url)
+
+    def test_user_is_resolved_from_cache(self):
+        with self.assertNumQueries(1):  # change stamps only
+            self.client.get(reverse('program-list'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_STATELESS_READS=True)
+    def test_stateless_reads(self):
+        user_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        # Writes and views that did not opt in still load the user
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(response.data['username'], self.username)
+
+class SchemaCacheTest(TestCase):
+    def setUp(self):
+        self.cache = schema_cache
+        self.cache.clear()
+
+    def test_schema_is_generated_once_and_revalidated(self):
+        generated = self.cache.generated
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('/clients/', json.loads(response.content)['paths'])
+        again = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        ui_spec = self.client.get('/swagger/', {'format': 'openapi'})
+        self.assertEqual(ui_spec['ETag'], response['ETag'])
+        self.assertEqual(self.cache.generated, generated + 1)
+
+    def test_schema_file_is_served(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'schema.json')
+            call_command('generate_schema', output=path, stdout=StringIO())
+            with override_settings(SCHEMA_FILE=path):
+                generated = self.cache.generated
+                response = self.client.get('/swagger.json')
+                with open(path, 'rb') as handle:
+                    self.assertEqual(response.content, handle.read())
+                self.assertEqual(self.cache.generated, generated)
+
+    def test_yaml_is_not_written_to_schema_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'schema.json')
+            with override_settings(SCHEMA_FILE=path):
+                with self.assertRaises(CommandError):
+                    call_command('generate_schema', format='yaml', stdout=StringIO())
+            self.assertFalse(os.path.exists(path))
+
+class AsyncReadViewTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Enrollment.objects.create(client=self.test_client, program=self.program, enrollment_date='2023-01-01')
+        for index in range(12):
+            Client.objects.create(**dict(self.client_data, first_name=f'Jane{index}'))
+        self.async_client = AsyncClient()
+        self.requests = [
+            ('/api/clients/', {}),
+            ('/api/clients/', {'page': 2}),
+            ('/api/clients/', {'search': 'jane'}),
+            (f'/api/clients/{self.test_client.id}/profile/', {}),
+            ('/api/clients/0/profile/', {}),
+            ('/api/enrollments/', {'client': self.test_client.id}),
+            ('/api/enrollments/', {'program': self.program.id, 'expand': 'client,program'}),
+        ]
+
+    def aget(self, url, params=None, token=None, **headers):
+        headers['Authorization'] = f'Bearer {token or self.token}'
+        return self.async_client.get(url, params, headers=headers)
+
+    async def test_responses_match_viewsets(self):
+        for url, params in self.requests:
+            expected = await sync_to_async(self.client.get)(url, params)
+            self.assertFalse(issubclass(getattr(expected.resolver_match.func, 'view_class', object), AsyncReadView))
+            response = await self.aget(url, params)
+            self.assertTrue(issubclass(response.resolver_match.func.view_class, AsyncReadView))
+            self.assertEqual(response.status_code, expected.status_code, url)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content), url)
+            self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+
+    async def test_cursor_pages_and_revalidation(self):
+        first = await self.aget('/api/clients/')
+        second = await self.aget(json.loads(first.content)['next'])
+        again = await self.aget('/api/clients/', **{'If-None-Match': first['ETag']})
+        self.assertEqual(len(json.loads(first.content)['results']), 10)
+        self.assertEqual(len(json.loads(second.content)['results']), 3)
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_authentication_errors(self):
+        anonymous = await self.async_client.get('/api/clients/')
+        invalid = await self.aget('/api/clients/', token='nope')
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(anonymous['WWW-Authenticate'], 'Bearer realm="api"')
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(invalid.content)['code'], 'token_not_valid')
+
+    async def test_writes_go_to_viewset(self):
+        response = await self.async_client.post(
+            '/api/clients/', json.dumps(dict(self.client_data, first_name='Posted')),
+            content_type='application/json', headers={'Authorization': f'Bearer {self.token}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        browsable = await self.aget('/api/clients/', Accept='text/html')
+        self.assertEqual(browsable['Content-Type'], 'text/html; charset=utf-8')
+
+class ReadReplicaTest(TransactionTestCase):
+    """A second SQLite file stands in for a replica that has not caught up."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        # The replica starts as a copy of the (still empty) primary
+        connections['default'].ensure_connection()
+        replica = sqlite3.connect(path)
+        connections['default'].connection.backup(replica)
+        replica.close()
+        connections.settings['replica'] = dict(connections.settings['default'], NAME=path)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='writer')
+        self.api = self.api_client(self.user)
+        self.client_data = {
+            'first_name': 'Primary', 'last_name': 'Row', 'date_of_birth': '1990-01-01', 'gender': 'F',
+            'contact_number': '0712345678', 'email': 'primary@example.com', 'address': 'Nairobi',
+        }
+        Client.objects.create(**self.client_data)
+        # Written straight to the replica file, bypassing the primary
+        Client.objects.using('replica').bulk_create([Client(**dict(self.client_data, first_name='Replica'))])
+        self.addCleanup(connections['replica'].cursor().execute, 'DELETE FROM clients_client')
+
+    def api_client(self, user):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return api
+
+    def names(self, api):
+        return [row['first_name'] for row in api.get(reverse('client-list')).data['results']]
+
+    def test_reads_use_primary_without_replicas(self):
+        self.assertEqual(self.names(self.api), ['Primary'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self.names(self.api), ['Replica'])
+        # A write request reads the primary (the client only exists there)
+        client = Client.objects.get()
+        response = self.api.post(reverse('enrollment-list'), {
+            'client': client.id,
+            'program': Program.objects.create(name='TB', description='').id,
+            'enrollment_date': '2024-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writer_reads_own_writes(self):
+        response = self.api.post(reverse('client-list'), dict(self.client_data, first_name='Posted'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.names(self.api), ['Posted', 'Primary'])
+        # Other users keep reading the replica
+        other = self.api_client(User.objects.create_user(username='reader', password='reader'))
+        self.assertEqual(self.names(other), ['Replica'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'], READ_REPLICA_PIN_SECONDS=0)
+    def test_no_pin_without_window(self):
+        self.api.post(reverse('client-list'), dict(self.client_data, first_name='Posted'), format='json')
+        self.assertEqual(self.names(self.api), ['Replica'])
+
+class ChangeFeedTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('change-feed')
+
+    def feed(self, since=0, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def entries(self, data):
+        return [(change['model'], change['id'], change['action']) for change in data['changes']]
+
+    def test_feed_follows_writes(self):
+        start = self.feed()['next']
+        self.test_client.first_name = 'Johnny'
+        self.test_client.save()
+        enrollment = Enrollment.objects.create(
+            client=self.test_client, program=self.program, enrollment_date='2023-01-01'
+        )
+        enrollment_id = enrollment.id
+        enrollment.delete()
+
+        data = self.feed(start)
+        self.assertEqual(self.entries(data), [
+            ('client', self.test_client.id, 'update'),
+            ('enrollment', enrollment_id, 'create'),
+            ('enrollment', enrollment_id, 'delete'),
+        ])
+        self.assertEqual(data['changes'][0]['data']['first_name'], 'Johnny')
+        self.assertIsNone(data['changes'][1]['data'])
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.feed(data['next'])['changes'], [])
+
+    def test_pages_follow_next(self):
+        for i in range(4):
+            Client.objects.create(**dict(self.client_data, first_name=f'Page{i}'))
+        seen, since, has_more = [], 0, True
+        while has_more:
+            data = self.feed(since, limit=2)
+            self.assertLessEqual(len(data['changes']), 2)
+            seen.extend(change['seq'] for change in data['changes'])
+            since, has_more = data['next'], data['has_more']
+        self.assertEqual(len(seen), 6)  # program, 5 clients
+        self.assertEqual(seen, sorted(seen))
+
+    def test_bulk_writes_are_logged(self):
+        start = self.feed()['next']
+        response = self.client.post(
+            reverse('client-bulk'), data=json.dumps([dict(self.client_data, first_name='Bulk')]),
+            content_type='application/json'
+        )
+        self.client.post(
+            reverse('program-enroll', args=[self.program.id]),
+            data=json.dumps({'client_ids': response.data['ids']}), content_type='application/json'
+        )
+        enrollment = Enrollment.objects.get(client_id=response.data['ids'][0])
+        self.assertEqual(self.entries(self.feed(start)), [
+            ('client', response.data['ids'][0], 'create'),
+            ('enrollment', enrollment.id, 'create'),
+        ])
+
+    def test_compaction_keeps_a_snapshot(self):
+        self.test_client.save()
+        self.test_client.save()
+        gone = Client.objects.create(**dict(self.client_data, first_name='Gone')).id
+        Client.objects.filter(pk=gone).delete()
+        cursor = self.feed()['next']
+
+        prune()
+        self.assertEqual(self.entries(self.feed()), [
+            ('program', self.program.id, 'create'),
+            ('client', self.test_client.id, 'update'),
+            ('client', gone, 'delete'),
+        ])
+
+        prune(retention_days=-1)
+        self.assertEqual(self.entries(self.feed()), [
+            ('program', self.program.id, 'create'),
+            ('client', self.test_client.id, 'update'),
+        ])
+        self.assertFalse(self.feed(cursor)['reset'])
+        reset = self.feed(cursor - 1)
+        self.assertTrue(reset['reset'])
+        self.assertEqual(reset['next'], 0)
+
+    def test_invalid_parameters(self):
+        for params in ({'since': 'x'}, {'since': -1}, {'limit': 0}, {'limit': 100000}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class DuplicateDetectionTest(BaseAPITestCase):
+    def post(self, data, **params):
+        url = reverse('client-list')
+        if params:
+            url += '?' + '&'.join(f'{name}={value}' for name, value in params.items())
+        return self.client.post(url, data=json.dumps(data), content_type='application/json')
+
+    def test_create_reports_likely_duplicate(self):
+        typo = dict(self.client_data, first_name='Jhon', contact_number='2541234567890')
+        response = self.post(typo)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual([d['client']['id'] for d in response.data['duplicates']], [self.test_client.id])
+        self.assertGreaterEqual(response.data['duplicates'][0]['score'], 0.8)
+        self.assertEqual(Client.objects.count(), 1)
+
+        response = self.post(typo, allow_duplicates='true')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Client.objects.count(), 2)
+
+    def test_phone_match_beyond_a_large_sound_block(self):
+        # Older clients that only share the Soundex block come first by pk
+        for i in range(3):
+            Client.objects.create(**dict(
+                self.client_data, first_name='Jane', date_of_birth='1960-01-01', contact_number=f'070000000{i}'
+            ))
+        duplicate = Client.objects.create(**dict(
+            self.client_data, last_name='Dow', date_of_birth='2000-02-02', contact_number='0733444555'
+        ))
+        with mock.patch.object(duplicates, 'MAX_CANDIDATES', 3):
+            response = self.post(dict(self.client_data, last_name='Dow', date_of_birth='2000-02-02',
+                                      contact_number='0733444555'))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['duplicates'][0]['client']['id'], duplicate.id)
+
+    def test_relatives_are_not_duplicates(self):
+        sibling = dict(self.client_data, first_name='Mary', gender='F', date_of_birth='1994-06-01')
+        self.assertEqual(self.post(sibling).status_code, status.HTTP_201_CREATED)
+
+    def test_keys_follow_updates(self):
+        self.test_client.last_name = 'Kamau'
+        self.test_client.save()
+        keys = dict(ClientMatchKey.objects.filter(client=self.test_client).values_list('kind', 'key'))
+        self.assertEqual(keys, {'name': 'kamau:1990', 'sound': 'j500k500', 'phone': '234567890'})
+
+    def test_find_duplicates_command(self):
+        self.client.post(
+            reverse('client-bulk'), data=json.dumps([
+                dict(self.client_data, first_name='Johm'),
+                dict(self.client_data, first_name='Alice', last_name='Wanjiku', contact_number='0700000001'),
+            ]), content_type='application/json'
+        )
+        duplicate = Client.objects.get(first_name='Johm')
+        out, err = StringIO(), StringIO()
+        call_command('find_duplicates', stdout=out, stderr=err)
+        rows = out.getvalue().splitlines()
+        self.assertEqual(rows[0], 'client_id,duplicate_id,score')
+        self.assertEqual([row.split(',')[:2] for row in rows[1:]], [[str(self.test_client.id), str(duplicate.id)]])
+        self.assertIn('Found 1 likely duplicates', err.getvalue())
+
+        out = StringIO()
+        call_command('find_duplicates', max_block_size=1, rebuild=True, stdout=out, stderr=StringIO())
+        self.assertEqual(out.getvalue().splitlines(), ['client_id,duplicate_id,score'])
+
+class ClientLookupTest(BaseAPITestCase):
+    def lookup(self, **params):
+        return self.client.get(reverse('client-lookup'), params)
+
+    def test_lookup_by_phone_and_email(self):
+        Client.objects.create(**dict(self.client_data, first_name='Other', contact_number='0700000000'))
+        for params in ({'phone': '123-456-7890'}, {'email': ' JOHN@Example.com'}):
+            response = self.lookup(**params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([c['id'] for c in response.data['results']][-1:], [self.test_client.id])
+        self.assertEqual(len(self.lookup(email='john@example.com').data['results']), 2)
+        self.assertEqual(self.lookup(phone='0799999999').data['results'], [])
+
+    def test_lookup_follows_updates(self):
+        self.test_client.contact_number = '0711222333'
+        self.test_client.save(update_fields=['contact_number'])
+        self.assertEqual(self.lookup(phone='1234567890').data['results'], [])
+        self.assertEqual(self.lookup(phone='0711 222 333').data['results'][0]['id'], self.test_client.id)
+
+    def test_lookup_uses_index(self):
+        plan = Client.objects.filter(phone_digits='1234567890').explain()
+        self.assertIn('client_phone_digits_idx', plan)
+        with self.assertNumQueries(2):  # user, clients
+            self.lookup(phone='1234567890')
+
+    def test_lookup_requires_a_value(self):
+        for params in ({}, {'phone': '--'}, {'email': ' '}):
+            self.assertEqual(self.lookup(**params).status_code, status.HTTP_400_BAD_REQUEST)
+
+class ClientAutocompleteTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for first_name, last_name in (('Jane', 'Doe'), ('Johnson', 'Kamau'), ('Mary', 'Johnson')):
+            Client.objects.create(**dict(self.client_data, first_name=first_name, last_name=last_name))
+
+    def complete(self, q, **params):
+        response = self.client.get(reverse('client-autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data['results']]
+
+    def test_prefix_of_either_name(self):
+        self.assertEqual(self.complete('jo'), ['John Doe', 'Johnson Kamau', 'Mary Johnson'])
+        self.assertEqual(self.complete('doe'), ['Jane Doe', 'John Doe'])
+        self.assertEqual(self.complete('Doe, Ja'), ['Jane Doe'])
+        self.assertEqual(self.complete('john d'), ['John Doe'])
+        self.assertEqual(self.complete('jo', limit=1), ['John Doe'])
+        self.assertEqual(self.complete(''), [])
+
+    def test_keys_have_no_spaces(self):
+        # Locale collations ignore spaces, which would break the key range scan
+        self.assertEqual(set(self.test_client.name_keys.values_list('key', flat=True)), {'johndoe', 'doejohn'})
+        self.assertEqual(self.complete('doe jo'), ['John Doe'])
+
+    def test_follows_renames(self):
+        self.test_client.first_name = 'Jonah'
+        self.test_client.save(update_fields=['first_name'])
+        self.assertEqual(self.complete('jona'), ['Jonah Doe'])
+        self.test_client.delete()
+        self.assertEqual(self.complete('jona'), [])
+
+    def test_served_from_the_index(self):
+        plan = ClientNameKey.objects.filter(key__range=('jo', 'joz')).order_by('key', 'client_id').values_list(
+            'client_id', 'display'
+        ).explain()
+        self.assertIn('COVERING INDEX client_name_key_idx', plan)
+        with self.assertNumQueries(2):  # user, name keys
+            self.complete('jo')
+        self.assertEqual(self.client.get(reverse('client-autocomplete'), {'q': 'jo', 'limit': 50}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+class ClientCohortFilterTest(BaseAPITestCase):
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        self.maternal = Program.objects.create(name='Maternal Health Program', description='')
+
+        def client(first_name, gender, age, status=None):
+            born = _years_before(today, age) - datetime.timedelta(days=1)
+            created = Client.objects.create(**dict(
+                self.client_data, first_name=first_name, gender=gender, date_of_birth=born
+            ))
+            if status:
+                Enrollment.objects.create(
+                    client=created, program=self.maternal, enrollment_date=today, status=status
+                )
+            return created
+
+        self.mother = client('Amina', 'F', 25, 'active')
+        client('Grace', 'F', 52, 'active')
+        client('Faith', 'F', 30, 'completed')
+        client('Brian', 'M', 30, 'active')
+        client('Mercy', 'F', 15)
+
+    def names(self, **params):
+        response = self.client.get(reverse('client-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(c['first_name'] for c in response.data['results'])
+
+    def test_cohort_filters(self):
+        self.assertEqual(self.names(
+            gender='F', min_age=15, max_age=49, program=self.maternal.id, enrollment_status='active'
+        ), ['Amina'])
+        self.assertEqual(self.names(gender='F', min_age=15, max_age=49), ['Amina', 'Faith', 'Mercy'])
+        self.assertEqual(self.names(max_age=15), ['Mercy'])
+        self.assertEqual(self.names(program=self.maternal.id), ['Amina', 'Brian', 'Faith', 'Grace'])
+        self.assertEqual(self.names(enrollment_status='completed'), ['Faith'])
+        today = datetime.date.today().isoformat()
+        self.assertEqual(len(self.names(created_from=today, created_to=today)), 6)
+        self.assertEqual(self.names(created_to='2000-01-01'), [])
+
+    def test_enroll_cohort(self):
+        response = self.client.post(
+            reverse('program-enroll', args=[self.program.id]),
+            data=json.dumps({'filter': {'gender': 'F', 'min_age': '15', 'max_age': '49'}}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.data['created'], 3)
+
+    def test_enrollment_filters_change_validators(self):
+        response = self.client.get(reverse('client-list'), {'program': self.maternal.id})
+        Enrollment.objects.filter(client=self.mother).update(status='completed')
+        touch(Enrollment)
+        again = self.client.get(
+            reverse('client-list'), {'program': self.maternal.id}, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+
+    def test_age_filters_revalidate_the_next_day(self):
+        url = reverse('client-list')
+        response = self.client.get(url, {'max_age': 15})
+        same_day = self.client.get(url, {'max_age': 15}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(same_day.status_code, status.HTTP_304_NOT_MODIFIED)
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=tomorrow):
+            next_day = self.client.get(url, {'max_age': 15}, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(next_day.status_code, status.HTTP_200_OK)
+            since = self.client.get(url, {'max_age': 15}, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(since.status_code, status.HTTP_200_OK)
+
+    def test_invalid_filters(self):
+        for params in ({'gender': 'X'}, {'min_age': 'old'}, {'max_age': -1}, {'created_from': '01/02/2024'},
+                       {'program': 'tb'}, {'enrollment_status': 'paused'}):
+            response = self.client.get(reverse('client-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_query_plan_uses_indexes(self):
+        plan = filter_clients(Client.objects.order_by(), {
+            'gender': 'F', 'min_age': '15', 'max_age': '49',
+            'program': str(self.maternal.id), 'enrollment_status': 'active',
+        }).explain()
+        self.assertIn('client_gender_dob_idx', plan)
+        # The (client, program) unique index
+        self.assertIn('clients_enrollment_client_id_program_id', plan)
+        plan = filter_clients(Client.objects.order_by(), {'max_age': '49'}).explain()
+        self.assertIn('client_dob_idx', plan)
+        plan = filter_clients(Client.objects.order_by(), {'created_from': '2024-01-01'}).explain()
+        self.assertIn('client_created_id_idx', plan)
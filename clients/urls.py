@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ClientViewSet, ProgramViewSet, EnrollmentViewSet, login_view, register_view, user_profile
+from .views import ClientViewSet, ProgramViewSet, EnrollmentViewSet, login_view, register_view, user_profile, dashboard_summary, change_feed
 
 router = DefaultRouter()
 router.register(r'clients', ClientViewSet)
@@ -12,5 +12,7 @@ urlpatterns = [
     path('auth/login/', login_view, name='login'),
     path('auth/register/', register_view, name='register'),
     path('auth/me/', user_profile, name='user-profile'),
+    path('dashboard/summary/', dashboard_summary, name='dashboard-summary'),
+    path('changes/', change_feed, name='change-feed'),
 ]
 
@@ -1,12 +1,31 @@
+import datetime
+
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from django.contrib.auth import authenticate
+from django.utils import timezone
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Client, Program, Enrollment
-from .serializers import ClientSerializer, ProgramSerializer, EnrollmentSerializer, ClientProfileSerializer, UserSerializer
+from .models import Client, Program, Enrollment, digits_only, normalize_email
+from .serializers import ClientSerializer, ProgramSerializer, EnrollmentSerializer, ClientProfileSerializer, UserSerializer, ProgramEnrollSerializer, ProgramRosterSerializer
+from .pagination import ClientPagination, EnrollmentPagination
+from .filters import AGE_PARAMS, ENROLLMENT_PARAMS, ClientCohortFilter, ClientSearchFilter, filter_clients
+from .profiles import cache_profile, get_cached_profile, profile_queryset, profile_version
+from .parsers import NDJSONParser
+from .bulk import bulk_create_clients, bulk_enroll, validate_rows
+from .export import ExportMixin
+from .conditional import ConditionalGetMixin, conditional_response
+from .response_cache import ResponseCacheMixin
+from .summary import dashboard_summary as build_dashboard_summary
+from .rollups import INTERVALS, program_stats
+from .changes import DEFAULT_LIMIT, MAX_LIMIT, read_changes
+from .duplicates import find_duplicates
+from .autocomplete import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, autocomplete_clients
 
 # Authentication Views
 @api_view(['POST'])
@@ -54,40 +73,301 @@ def user_profile(request):
     serializer = UserSerializer(request.user)
     return Response(serializer.data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_summary(request):
+    # Counts come from maintained summary rows, not from counting the tables
+    return Response(build_dashboard_summary())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def change_feed(request):
+    """
+    Creates, updates and deletes of clients, programs and enrollments after
+    ``?since=`` (a ``seq``, 0 for everything), oldest first, at most
+    ``?limit=`` per page. Continue from ``next`` while ``has_more``; on
+    ``reset`` discard local data and start again from ``since=0``.
+    """
+    params = {}
+    for name, default in (('since', 0), ('limit', DEFAULT_LIMIT)):
+        try:
+            params[name] = int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError({name: 'A valid integer is required.'})
+    if params['since'] < 0:
+        raise ValidationError({'since': 'Ensure this value is greater than or equal to 0.'})
+    if not 1 <= params['limit'] <= MAX_LIMIT:
+        raise ValidationError({'limit': f'Ensure this value is between 1 and {MAX_LIMIT}.'})
+    return Response(read_changes(**params))
+
 # Existing ViewSets
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_user = True
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ClientPagination
+    filter_backends = [filters.OrderingFilter, ClientSearchFilter, ClientCohortFilter]
     search_fields = ['first_name', 'last_name', 'email']
     ordering_fields = ['first_name', 'last_name', 'created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', 'id']
+    bulk_max_rows = 50000
+    lookup_max_results = 20
+    export_filename = 'clients'
+    export_fields = ['id', 'first_name', 'last_name', 'date_of_birth', 'gender',
+                     'contact_number', 'email', 'address', 'created_at']
+
+    def get_queryset(self):
+        if self.action == 'profile':
+            return profile_queryset()
+        return super().get_queryset()
+
+    def get_conditional_models(self):
+        # Filtering on enrollments makes the list depend on them
+        if self.request is not None and set(ENROLLMENT_PARAMS) & set(self.request.query_params):
+            return [Client, Enrollment]
+        return super().get_conditional_models()
+
+    def get_conditional_date(self):
+        # Ages are counted on today's date, so the same filter matches other rows tomorrow
+        if self.request is not None and set(AGE_PARAMS) & set(self.request.query_params):
+            return timezone.localdate()
+        return None
+
+    def create(self, request, *args, **kwargs):
+        """
+        Register a client, unless it looks like one already registered: likely
+        duplicates are returned with a 409 and their match score. Repeat the
+        request with ``?allow_duplicates=true`` to register it anyway.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.query_params.get('allow_duplicates') not in ('1', 'true'):
+            duplicates = find_duplicates(Client(**serializer.validated_data))
+            if duplicates:
+                return Response({
+                    'error': 'This client may already be registered',
+                    'duplicates': [
+                        {'score': value, 'client': ClientSerializer(candidate).data}
+                        for value, candidate in duplicates
+                    ],
+                }, status=status.HTTP_409_CONFLICT)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
-        client = self.get_object()
-        serializer = ClientProfileSerializer(client)
-        return Response(serializer.data)
+        def render():
+            data = get_cached_profile(pk)
+            if data is None:
+                client = self.get_object()
+                data = ClientProfileSerializer(client).data
+                cache_profile(client.pk, data)
+            return Response(data)
+
+        version = profile_version(pk)
+        if version is None:
+            return render()
+        return conditional_response(request, *version, render)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Up to ``?limit=`` (default 10, at most 20) ``id``/``name`` pairs of
+        clients whose first or last name, or full name in either order,
+        starts with ``?q=``; read from the name index alone.
+        """
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SUGGESTIONS))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if not 1 <= limit <= MAX_SUGGESTIONS:
+            raise ValidationError({'limit': f'Ensure this value is between 1 and {MAX_SUGGESTIONS}.'})
+        return Response({'results': autocomplete_clients(request.query_params.get('q', ''), limit)})
 
-class ProgramViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        Clients with exactly this ``?phone=`` (digits compared, punctuation
+        ignored) and/or ``?email=`` (case-insensitive), newest first; an
+        indexed equality match for check-in.
+        """
+        params = request.query_params
+        lookups = {}
+        if 'phone' in params:
+            lookups['phone_digits'] = digits_only(params['phone'])
+            if not lookups['phone_digits']:
+                raise ValidationError({'phone': 'Enter a phone number.'})
+        if 'email' in params:
+            lookups['email_lower'] = normalize_email(params['email'])
+            if not lookups['email_lower']:
+                raise ValidationError({'email': 'Enter an email address.'})
+        if not lookups:
+            return Response({'error': 'Expected a phone or email to look up'}, status=status.HTTP_400_BAD_REQUEST)
+
+        clients = Client.objects.filter(**lookups).order_by('-created_at', 'id')[:self.lookup_max_results]
+        return Response({'results': ClientSerializer(clients, many=True).data})
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Register many clients at once from a JSON array or NDJSON body.
+
+        Rows are validated like a single create; invalid rows are reported by
+        index and the valid ones are still inserted.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Expected a list of clients'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.bulk_max_rows:
+            return Response(
+                {'error': f'At most {self.bulk_max_rows} clients per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        valid, errors = validate_rows(rows, ClientSerializer)
+        created = bulk_create_clients([data for _, data in valid])
+        return Response({
+            'created': len(created),
+            'failed': len(errors),
+            'ids': [client.pk for client in created],
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+class ProgramViewSet(ConditionalGetMixin, ResponseCacheMixin, ExportMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_user = True
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['name', 'created_at']
     ordering = ['-created_at']
+    export_filename = 'programs'
+    export_fields = ['id', 'name', 'description', 'created_at']
+    roster_ordering_fields = {
+        'enrollment_date': 'enrollment_date',
+        'first_name': 'client__first_name',
+        'last_name': 'client__last_name',
+    }
+
+    @action(detail=True, methods=['get'])
+    def clients(self, request, pk=None):
+        """
+        Clients enrolled in the program, each with their enrollment status and
+        date, in one joined query. Filter with ``?status=``, sort with
+        ``?order_by=`` (enrollment_date, first_name, last_name); the default
+        newest-first order is cursor paginated.
+        """
+        program = self.get_object()
+        queryset = Enrollment.objects.filter(program=program).select_related('client')
+
+        enrollment_status = request.query_params.get('status')
+        if enrollment_status:
+            if enrollment_status not in dict(Enrollment.STATUS_CHOICES):
+                raise ValidationError({'status': f'"{enrollment_status}" is not a valid choice.'})
+            queryset = queryset.filter(status=enrollment_status)
+
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM)
+        if ordering and ordering.lstrip('-') in self.roster_ordering_fields:
+            direction = '-' if ordering.startswith('-') else ''
+            queryset = queryset.order_by(direction + self.roster_ordering_fields[ordering.lstrip('-')], 'id')
+        else:
+            queryset = queryset.order_by('-enrollment_date', 'id')
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+        paginator = EnrollmentPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ProgramRosterSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Enrollments per ``?interval=`` (day or month, default month) by status,
+        read from the maintained rollup. Narrow with ``?start=``, ``?end=``
+        (YYYY-MM-DD) and ``?status=``.
+        """
+        program = self.get_object()
+        params = request.query_params
+        interval = params.get('interval', 'month')
+        if interval not in INTERVALS:
+            raise ValidationError({'interval': f'"{interval}" is not a valid choice.'})
+        enrollment_status = params.get('status')
+        if enrollment_status and enrollment_status not in dict(Enrollment.STATUS_CHOICES):
+            raise ValidationError({'status': f'"{enrollment_status}" is not a valid choice.'})
+        bounds = {}
+        for name in ('start', 'end'):
+            if params.get(name):
+                try:
+                    bounds[name] = datetime.date.fromisoformat(params[name])
+                except ValueError:
+                    raise ValidationError({name: 'Date has wrong format. Use YYYY-MM-DD.'})
+
+        return Response({
+            'program': program.pk,
+            'interval': interval,
+            'results': program_stats(program, interval, status=enrollment_status, **bounds),
+        })
+
+    @action(detail=True, methods=['post'])
+    def enroll(self, request, pk=None):
+        """
+        Enroll a cohort of clients, given as ``client_ids`` or as a client
+        list ``filter``; clients already in the program are skipped.
+        """
+        program = self.get_object()
+        serializer = ProgramEnrollSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'filter' in data:
+            queryset = filter_clients(Client.objects.order_by(), data['filter'])
+            client_ids = list(queryset.values_list('pk', flat=True))
+        else:
+            client_ids = data['client_ids']
+
+        created, skipped, not_found = bulk_enroll(
+            program, client_ids, data['enrollment_date'], data['status'], data['notes']
+        )
+        return Response({
+            'created': created,
+            'skipped': skipped,
+            'not_found': not_found,
+        })
+
+class EnrollmentViewSet(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    stateless_user = True
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    pagination_class = EnrollmentPagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['enrollment_date', 'status']
-    ordering = ['-enrollment_date']
+    ordering = ['-enrollment_date', 'id']
+    export_filename = 'enrollments'
+    export_fields = ['id', ('client', 'client_id'), ('program', 'program_id'),
+                     ('program_name', 'program__name'), 'enrollment_date', 'status', 'notes']
+    # Rows show the program name and, with ?expand=, the client and program
+    conditional_models = [Enrollment, Program, Client]
+    conditional_fields = ('updated_at', 'program__updated_at', 'client__updated_at')
+
+    def get_expand(self):
+        """Relations named in ``?expand=client,program``, joined into the list query."""
+        if self.request is None:
+            # Schema generation without a request
+            return []
+        requested = self.request.query_params.get('expand', '')
+        return [name for name in requested.split(',') if name in EnrollmentSerializer.expandable]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
 
     def get_queryset(self):
-        queryset = Enrollment.objects.all()
+        queryset = Enrollment.objects.select_related('program', *self.get_expand())
+        if self.request is None:
+            return queryset
         client_id = self.request.query_params.get('client', None)
         program_id = self.request.query_params.get('program', None)
         
@@ -0,0 +1,31 @@
+"""
+URLconf of the ASGI entry point: the async read views of
+``clients.async_urls`` in front of the regular routes.
+``AsyncRoutesMiddleware`` selects it per request, so only requests served
+over ASGI reach the async views.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/', include('clients.async_urls')),
+] + wsgi_urlpatterns
+
+
+class AsyncRoutesMiddleware:
+    """Resolve ASGI requests against this URLconf instead of ``ROOT_URLCONF``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if isinstance(request, ASGIRequest):
+            request.urlconf = __name__
+        return self.get_response(request)
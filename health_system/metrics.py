@@ -0,0 +1,237 @@
+"""
+Per-request SQL and timing instrumentation.
+
+``RequestMetricsMiddleware`` times every request, the SQL it runs (through
+an execute wrapper on every database connection) and the serializer work
+reported by ``timed('serialize')``. With ``DEBUG`` on each response gets a
+``Server-Timing`` header, and the numbers are aggregated per resolved view
+name (``client-list``, ``client-profile``...) into histograms exposed in the
+Prometheus text format by ``metrics_view``, which needs ``METRICS_TOKEN``
+unless ``DEBUG`` is on.
+
+Aggregates live in process memory, so under gunicorn each worker reports
+its own series; scrape every worker or sum them downstream.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'stages', 'depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.stages = {}
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def timed(stage):
+    """Add the time spent in the block to ``stage`` of the current request."""
+    metrics = _current.get()
+    if metrics is None or metrics.depth:
+        # Outside a request, or nested inside another timed block
+        yield
+        return
+    metrics.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth -= 1
+        metrics.stages[stage] = metrics.stages.get(stage, 0.0) + time.perf_counter() - started
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.collectors = []
+
+    def record(self, view, status, total, metrics):
+        with self.lock:
+            series = self.views.get(view)
+            if series is None:
+                series = self.views[view] = {
+                    'duration': Histogram(),
+                    'db': Histogram(),
+                    'queries': 0,
+                    'stages': {},
+                    'errors': 0,
+                }
+            series['duration'].observe(total)
+            series['db'].observe(metrics.db_time)
+            series['queries'] += metrics.queries
+            for stage, seconds in metrics.stages.items():
+                series['stages'][stage] = series['stages'].get(stage, 0.0) + seconds
+            if status >= 500:
+                series['errors'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def render(self):
+        lines = []
+        with self.lock:
+            views = sorted(self.views.items())
+            self._histogram(lines, 'http_request_duration_seconds',
+                            'Total request time by view', views, 'duration')
+            self._histogram(lines, 'http_request_db_duration_seconds',
+                            'Time spent in SQL by view', views, 'db')
+            lines.append('# HELP http_request_db_queries_total SQL queries by view')
+            lines.append('# TYPE http_request_db_queries_total counter')
+            for view, series in views:
+                lines.append(f'http_request_db_queries_total{{view="{view}"}} {series["queries"]}')
+            lines.append('# HELP http_request_stage_seconds_total Time spent per stage (e.g. serialize) by view')
+            lines.append('# TYPE http_request_stage_seconds_total counter')
+            for view, series in views:
+                for stage, seconds in sorted(series['stages'].items()):
+                    lines.append(
+                        f'http_request_stage_seconds_total{{view="{view}",stage="{stage}"}} {seconds:.6f}'
+                    )
+            lines.append('# HELP http_request_errors_total Responses with a 5xx status by view')
+            lines.append('# TYPE http_request_errors_total counter')
+            for view, series in views:
+                lines.append(f'http_request_errors_total{{view="{view}"}} {series["errors"]}')
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, lines, name, help_text, views, key):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for view, series in views:
+            histogram = series[key]
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{view="{view}"}} {histogram.total:.6f}')
+            lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+
+
+registry = Registry()
+
+
+def register_collector(collector):
+    """Append the exposition lines returned by ``collector()`` to every scrape."""
+    registry.collectors.append(collector)
+
+
+def server_timing(total, metrics):
+    entries = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+    for stage, seconds in metrics.stages.items():
+        entries.append(f'{stage};dur={seconds * 1000:.2f}')
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def instrument_connection(sender=None, connection=None, **kwargs):
+    # Installed once per connection and fed by the request's context, so it
+    # also sees the queries async views run in sync_to_async threads
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """Records timings per request; keep it first in ``MIDDLEWARE``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            # Under ASGI, async views are awaited without a thread hop
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for alias in connections:
+            instrument_connection(connection=connections[alias])
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+        registry.record(view, response.status_code, total, metrics)
+        if settings.DEBUG:
+            # Query counts and timings are not for every client to see
+            response['Server-Timing'] = server_timing(total, metrics)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus text exposition; requires ``METRICS_TOKEN`` as a bearer token unless ``DEBUG`` is on."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
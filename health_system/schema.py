@@ -0,0 +1,95 @@
+"""
+Precomputed OpenAPI schema.
+
+The schema only changes when the code does, so with ``SCHEMA_CACHE`` on it
+is built once per process (or read from ``SCHEMA_FILE``, written at deploy
+time by ``manage.py generate_schema``) and every request for the spec is
+answered from memory with an ``ETag``, so pollers revalidate with a 304.
+The Swagger UI and ReDoc pages stay dynamic; they are cheap, and the spec
+they fetch (``?format=openapi``) is served from the same cache.
+"""
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+api_info = openapi.Info(
+    title="Health Information System API",
+    default_version='v1',
+    description="API for managing clients and health programs",
+    terms_of_service="https://www.example.com/terms/",
+    contact=openapi.Contact(email="contact@example.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+CODECS = {
+    'json': (OpenAPICodecJson, 'application/json'),
+    'yaml': (OpenAPICodecYaml, 'application/yaml'),
+}
+
+
+def generate_schema(fmt='json'):
+    """Introspect every endpoint and encode the public schema."""
+    schema = OpenAPISchemaGenerator(api_info).get_schema(request=None, public=True)
+    codec, _ = CODECS[fmt]
+    return codec(validators=[]).encode(schema)
+
+
+class SchemaCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.generated = 0
+
+    def get(self, fmt):
+        """``(content, etag)``, built on first use."""
+        entry = self.entries.get(fmt)
+        if entry is None:
+            with self.lock:
+                entry = self.entries.get(fmt)
+                if entry is None:
+                    entry = self.entries[fmt] = self.load(fmt)
+        return entry
+
+    def load(self, fmt):
+        path = getattr(settings, 'SCHEMA_FILE', None)
+        if fmt == 'json' and path and os.path.exists(path):
+            with open(path, 'rb') as handle:
+                content = handle.read()
+        else:
+            content = generate_schema(fmt)
+            self.generated += 1
+        return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+
+schema_cache = SchemaCache()
+
+
+def cached_schema_view(request, format='.json'):
+    fmt = 'yaml' if format == '.yaml' else 'json'
+    content, etag = schema_cache.get(fmt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=CODECS[fmt][1])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def with_cached_spec(ui_view):
+    """Serve a UI view's ``?format=openapi`` spec request from the cache."""
+    def view(request, *args, **kwargs):
+        if request.GET.get('format') == 'openapi':
+            return cached_schema_view(request)
+        return ui_view(request, *args, **kwargs)
+    return view
@@ -24,6 +24,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'health_system.metrics.RequestMetricsMiddleware',
+    'health_system.asgi_urls.AsyncRoutesMiddleware',
+    'clients.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -34,6 +37,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Requests served over ASGI use health_system.asgi_urls (async read endpoints)
 ROOT_URLCONF = 'health_system.urls'
 
 TEMPLATES = [
@@ -64,6 +68,18 @@ DATABASES = {
     }
 }
 
+# Read replicas (aliases in DATABASES) for safe requests to the clients API;
+# see clients/replicas.py. A user who writes reads from the primary for
+# READ_REPLICA_PIN_SECONDS, tracked in a cache that all workers must share.
+# Locally, DB_REPLICA_NAME=<a copy of db.sqlite3> adds a second SQLite file.
+DATABASE_REPLICAS = []
+if os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = dict(DATABASES['default'], NAME=os.environ['DB_REPLICA_NAME'], TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['clients.replicas.ReplicaRouter']
+READ_REPLICA_PIN_SECONDS = 5
+READ_REPLICA_PIN_CACHE_ALIAS = 'default'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,13 +108,52 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Serve the OpenAPI schema from memory: built once per process, or read from
+# SCHEMA_FILE when it exists (write it at deploy with `manage.py generate_schema`)
+SCHEMA_CACHE = True
+SCHEMA_FILE = os.environ.get('SCHEMA_FILE')
+
+# Bearer token required by /metrics/. Without one, /metrics/ and the
+# Server-Timing response header are only served with DEBUG on.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Seconds to cache assembled client profiles; None disables the cache.
+# Needs a cache shared by all workers (Redis, Memcached) under gunicorn.
+CLIENT_PROFILE_CACHE_TIMEOUT = None
+CLIENT_PROFILE_CACHE_ALIAS = 'default'
+
+# Response cache of read-mostly viewsets (programs); None disables it.
+# FileBackend takes {'directory': ..., 'max_entries': ...} and is shared by
+# the workers of one host.
+RESPONSE_CACHE_BACKEND = 'clients.response_cache.MemoryBackend'
+RESPONSE_CACHE_OPTIONS = {'max_entries': 1000}
+
+# Seconds an authenticated user is reused without querying auth_user. Saves
+# and deletes clear the entry in the same process only; others wait this out.
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+# Let GET requests to the client/program/enrollment viewsets authenticate from
+# the token claims alone (no user lookup; deactivation applies on token expiry)
+AUTH_STATELESS_READS = False
+
+# Days /api/changes/ keeps delete tombstones; consumers that have not synced
+# for longer are told to reset. Serve only entries older than
+# CHANGE_FEED_SETTLE_SECONDS (a few seconds on PostgreSQL, where concurrent
+# writers can commit out of sequence order).
+CHANGE_FEED_RETENTION_DAYS = 30
+CHANGE_FEED_SETTLE_SECONDS = 0
+
+# Match score (0-1, see clients/duplicates.py) from which a new client is
+# reported as a likely duplicate of an existing one
+DUPLICATE_MATCH_THRESHOLD = 0.8
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': ['rest_framework.filters.OrderingFilter'],
     'ORDERING_PARAM': 'order_by',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'clients.authentication.CachedJWTAuthentication',
     ),
 }
 
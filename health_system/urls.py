@@ -1,22 +1,17 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include, re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from .metrics import metrics_view
+from .schema import api_info, cached_schema_view, with_cached_spec
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
 schema_view = get_schema_view(
-   openapi.Info(
-      title="Health Information System API",
-      default_version='v1',
-      description="API for managing clients and health programs",
-      terms_of_service="https://www.example.com/terms/",
-      contact=openapi.Contact(email="contact@example.com"),
-      license=openapi.License(name="BSD License"),
-   ),
+   api_info,
    public=True,
    permission_classes=(permissions.AllowAny,),
 )
@@ -24,14 +19,24 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('clients.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     
     # JWT Authentication
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    
-    # Swagger documentation
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
 
+# Swagger documentation
+if settings.SCHEMA_CACHE:
+    urlpatterns += [
+        re_path(r'^swagger(?P<format>\.json|\.yaml)$', cached_schema_view, name='schema-json'),
+        path('swagger/', with_cached_spec(schema_view.with_ui('swagger', cache_timeout=0)), name='schema-swagger-ui'),
+        path('redoc/', with_cached_spec(schema_view.with_ui('redoc', cache_timeout=0)), name='schema-redoc'),
+    ]
+else:
+    urlpatterns += [
+        re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
+